@@ -0,0 +1,157 @@
+# backend/bench/location_load.py
+# ทดสอบโหลด location server: จำลอง client N ตัวใน M group ยิง update_location แล้ววัด throughput / latency / CPU / memory
+#
+# รัน server แบบปิด auth ก่อน (group_id เป็นชื่ออะไรก็ได้):
+#   LOCATION_AUTH_REQUIRED=0 python get_location.py
+# แล้วรัน:
+#   python bench/location_load.py --clients 200 --groups 20 --rate 1 --duration 30
+import argparse
+import asyncio
+import math
+import random
+import time
+
+import httpx
+import socketio
+
+# ขยับแต่ละครั้งไกลกว่า LOCATION_MIN_MOVE_METERS (ค่าเริ่มต้น 5 ม.) เพื่อให้ถูก broadcast จริง
+STEP_DEGREES = 0.0001  # ≈ 11 เมตร
+BASE_LAT, BASE_LNG = 13.7563, 100.5018
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+        self.received_frames = 0
+        self.received_locations = 0
+        # fan-out latency (วินาที) = เวลาที่ client อื่นได้รับ - เวลาที่ผู้ส่งส่ง (อยู่เครื่องเดียวกัน นาฬิกาตรงกัน)
+        self.latencies = []
+        self.ack_latencies = []
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lower, upper = math.floor(k), math.ceil(k)
+    if lower == upper:
+        return values[int(k)]
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+async def run_client(index: int, args, stats: Stats, stop: asyncio.Event):
+    client = socketio.AsyncClient(reconnection=False)
+    group_id = f"bench-{index % args.groups}"
+
+    @client.on('group_locations')
+    async def on_group_locations(locations):
+        now = time.time()
+        stats.received_frames += 1
+        stats.received_locations += len(locations)
+        for location in locations:
+            sent_at = location.get('timestamp')
+            if isinstance(sent_at, (int, float)):
+                stats.latencies.append(now - sent_at)
+
+    try:
+        await client.connect(args.url, transports=['websocket'])
+        ack = await client.call('join_group', {'group_id': group_id, 'username': f'bench-{index}'}, timeout=10)
+        if ack.get('status') != 'success':
+            print(f"⚠️ client {index} join failed: {ack}")
+            stats.errors += 1
+            return
+
+        lat = BASE_LAT + random.uniform(-0.01, 0.01)
+        lng = BASE_LNG + random.uniform(-0.01, 0.01)
+        interval = 1 / args.rate
+        # กระจายเวลาเริ่ม ไม่ให้ทุก client ยิงพร้อมกัน
+        await asyncio.sleep(random.uniform(0, interval))
+        while not stop.is_set():
+            lat += random.choice((-1, 1)) * STEP_DEGREES
+            lng += random.choice((-1, 1)) * STEP_DEGREES
+            sent_at = time.time()
+            stats.sent += 1
+            try:
+                ack = await client.call('update_location', {'lat': lat, 'lng': lng, 'timestamp': sent_at}, timeout=10)
+                stats.acked += 1
+                stats.ack_latencies.append(time.time() - sent_at)
+                if ack.get('status') == 'error':
+                    stats.errors += 1
+            except Exception:
+                stats.errors += 1
+            await asyncio.sleep(max(0.0, interval - (time.time() - sent_at)))
+    except Exception as e:
+        print(f"⚠️ client {index} error: {e}")
+        stats.errors += 1
+    finally:
+        if client.connected:
+            await client.disconnect()
+
+
+async def fetch_status(http: httpx.AsyncClient, url: str, token: str = None) -> dict:
+    # รันผ่าน main.py (port 8000) /api/status ต้องส่ง JWT ด้วย (--token)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    try:
+        response = await http.get(f"{url}/api/status", headers=headers)
+        return response.json().get('memory', {})
+    except Exception as e:
+        print(f"⚠️ /api/status error: {e}")
+        return {}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test for the Socket.IO location server")
+    parser.add_argument('--url', default='http://localhost:8010')
+    parser.add_argument('--clients', type=int, default=100, help="จำนวน client ทั้งหมด")
+    parser.add_argument('--groups', type=int, default=10, help="จำนวน group (client กระจายเท่าๆ กัน)")
+    parser.add_argument('--rate', type=float, default=1.0, help="update_location ต่อวินาทีต่อ client")
+    parser.add_argument('--duration', type=float, default=30.0, help="วินาที")
+    parser.add_argument('--ramp', type=float, default=5.0, help="ทยอยต่อ client ภายในกี่วินาที")
+    parser.add_argument('--token', default=None, help="JWT สำหรับ /api/status เมื่อรันผ่าน main.py")
+    args = parser.parse_args()
+
+    stats = Stats()
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(timeout=10) as http:
+        before = await fetch_status(http, args.url, args.token)
+
+        print(f"🚀 {args.clients} clients / {args.groups} groups @ {args.rate}/s for {args.duration}s -> {args.url}")
+        tasks = []
+        for i in range(args.clients):
+            tasks.append(asyncio.create_task(run_client(i, args, stats, stop)))
+            await asyncio.sleep(args.ramp / max(args.clients, 1))
+
+        started = time.time()
+        await asyncio.sleep(args.duration)
+        during = await fetch_status(http, args.url, args.token)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.time() - started
+
+    print("=" * 60)
+    print(f"📤 sent: {stats.sent} ({stats.sent / elapsed:.1f}/s), acked: {stats.acked}, errors: {stats.errors}")
+    print(f"📥 frames: {stats.received_frames} ({stats.received_frames / elapsed:.1f}/s), "
+          f"locations delivered: {stats.received_locations} ({stats.received_locations / elapsed:.1f}/s)")
+    for name, values in (("fan-out latency", stats.latencies), ("ack latency", stats.ack_latencies)):
+        print(f"⏱️ {name} ms: p50={percentile(values, 50) * 1000:.1f} "
+              f"p95={percentile(values, 95) * 1000:.1f} p99={percentile(values, 99) * 1000:.1f} "
+              f"max={(max(values) if values else float('nan')) * 1000:.1f}")
+
+    cpu_before = before.get('process_cpu_seconds')
+    cpu_during = during.get('process_cpu_seconds')
+    if cpu_before is not None and cpu_during is not None:
+        # before เก็บก่อน ramp ด้วย จึงหารด้วยช่วงเวลารวม ramp
+        print(f"🖥️ server CPU: {(cpu_during - cpu_before) / (args.duration + args.ramp) * 100:.1f}% of one core")
+    if during:
+        print(f"💾 server memory: max_rss={during.get('process_max_rss_kb')} KB, "
+              f"members={during.get('members')}, locations={during.get('locations')}, "
+              f"pending={during.get('pending_locations')}, history_bytes={during.get('history_bytes')}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -7,6 +7,8 @@ from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import json
+import base64
+import hashlib
 from schemas import City
 
 load_dotenv()
@@ -67,3 +69,34 @@ def load_cities_data():
 
 def get_cities_list():
     return cities_data
+
+# Keyset Pagination
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+# Conditional GET
+def make_etag(*validators) -> str:
+    """ETag จากค่าที่เปลี่ยนทุกครั้งที่ข้อมูลเปลี่ยน (updatedAt, version, จำนวนสมาชิก ฯลฯ) ไม่ต้อง hash body ทั้งก้อน"""
+    raw = json.dumps(validators, default=str, sort_keys=True, separators=(",", ":"))
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()[:16]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """เช็ค If-None-Match ว่าตรงกับ ETag ปัจจุบันหรือไม่ (รองรับหลายค่าคั่นด้วย , และ W/)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
@@ -1,84 +1,373 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
 import socketio
 import uvicorn
-from datetime import datetime
-from typing import Dict
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, date, time as dt_time
+from typing import Dict, Optional, Set
 
-app = FastAPI()
+from service.geo import haversine_m
+from service.location_store import create_location_store, create_client_manager, LOCATION_STORE
+from service.location_codec import encode_frame, KIND_LOCATIONS, KIND_SNAPSHOT
+from service.location_history import LocationHistory
+from service.proximity import ProximityIndex, GeofenceTracker, stop_from_slot
+from service.membership_cache import membership_cache
+from db import db
+
+# ส่ง location ของทั้ง group เป็นชุดเดียวทุกๆ กี่วินาที (0.5 = 2 Hz)
+BROADCAST_INTERVAL = float(os.getenv("LOCATION_BROADCAST_INTERVAL", "0.5"))
+# ขยับน้อยกว่านี้ (เมตร) ไม่ต้อง broadcast
+MIN_MOVE_METERS = float(os.getenv("LOCATION_MIN_MOVE_METERS", "5"))
+# location ที่ไม่ได้อัปเดตนานเกินนี้ (วินาที) ถือว่าหลุดไปแล้ว ลบทิ้ง
+LOCATION_TTL_SECONDS = float(os.getenv("LOCATION_TTL_SECONDS", "300"))
+SWEEP_INTERVAL = float(os.getenv("LOCATION_SWEEP_INTERVAL", "30"))
+# สมาชิกที่ไม่มี worker ไหนต่ออายุ heartbeat (ทุก SWEEP_INTERVAL) นานเกินนี้ ถือว่า worker ตายไปแล้ว ลบทิ้ง
+MEMBER_TTL_SECONDS = float(os.getenv("LOCATION_MEMBER_TTL_SECONDS", str(SWEEP_INTERVAL * 4)))
+# จำนวนสมาชิกสูงสุดต่อ group
+MAX_GROUP_MEMBERS = int(os.getenv("LOCATION_MAX_GROUP_MEMBERS", "50"))
+# รูปแบบข้อมูลที่ client เลือกได้ตอน join_group: json (ค่าเริ่มต้น) หรือ packed (binary ดู service/location_codec.py)
+ENCODINGS = ('json', 'packed')
+# ต้องส่ง JWT และเป็นสมาชิกของ TripGroup ถึงจะ join ได้ (ปิดได้ตอนทดสอบในเครื่อง)
+AUTH_REQUIRED = os.getenv("LOCATION_AUTH_REQUIRED", "1") == "1"
+
+
+_tasks = []
+
+
+async def start_location_server():
+    """เริ่ม background task ของ location server (เรียกจาก lifespan ของ main.app หรือ app ของไฟล์นี้)"""
+    if AUTH_REQUIRED:
+        try:
+            await membership_cache.warm()
+        except Exception as e:
+            print(f"⚠️ Membership cache warm-up failed: {e}")
+    if not HISTORY_ENABLED:
+        print("⚠️ LOCATION_STORE=%s: trajectories API disabled (location history is per process)" % LOCATION_STORE)
+    if not PROXIMITY_ENABLED:
+        print("⚠️ LOCATION_STORE=%s: member_nearby disabled (proximity index is per process)" % LOCATION_STORE)
+    _tasks.append(asyncio.create_task(broadcast_loop()))
+    _tasks.append(asyncio.create_task(sweep_loop()))
+
+
+async def stop_location_server():
+    for task in _tasks:
+        task.cancel()
+    # รอให้ task จบจริงก่อนปิด store (CancelledError ไม่ต้องโยนต่อ)
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await store.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ใช้ตอนรันแยกเป็น process ของตัวเอง (python get_location.py) ถ้ารันผ่าน main.py จะใช้ lifespan ของ main แทน
+    if AUTH_REQUIRED:
+        await db.connect()
+    await start_location_server()
+    yield
+    await stop_location_server()
+    if db.is_connected():
+        await db.disconnect()
+
+
+router = APIRouter(tags=["Location"])
 
 sio = socketio.AsyncServer(
-    async_mode='asgi', 
+    async_mode='asgi',
     cors_allowed_origins='*',
     logger=True,
-    engineio_logger=False
+    engineio_logger=False,
+    # ตั้ง LOCATION_STORE=redis เพื่อให้ room/emit ใช้ร่วมกันได้หลาย process
+    client_manager=create_client_manager()
 )
 
-socket_app = socketio.ASGIApp(sio, app)
-
 # ==========================================
 # 💾 ส่วนที่เพิ่ม/แก้ไขข้อมูล (Data Store)
 # ==========================================
 
-# เก็บข้อมูล: {socket_id: group_id}
-user_groups: Dict[str, str] = {}
+# สมาชิก ({socket_id: group_id, username}) และ location ล่าสุดของแต่ละ group
+# เก็บใน memory (ค่าเริ่มต้น) หรือ Redis ตาม LOCATION_STORE ดู service/location_store.py
+store = create_location_store()
 
-# [ใหม่] เก็บชื่อ: {socket_id: username}
-user_names: Dict[str, str] = {}
+# socket ที่ต่ออยู่กับ process นี้และอยู่ใน group (ใช้ต่ออายุ heartbeat ใน store)
+local_members: Set[str] = set()
 
-# เก็บ location แยกตาม group: {group_id: {socket_id: location_data}}
-group_locations: Dict[str, Dict[str, dict]] = {}
+# location ล่าสุดที่รอส่งในรอบถัดไป: {group_id: {socket_id: location_data}}
+# ถ้าส่งมาหลายครั้งภายในรอบเดียว จะเหลือแค่อันล่าสุด (เก็บแยกแต่ละ process ได้ เพราะ emit ผ่าน client manager)
+pending_locations: Dict[str, Dict[str, dict]] = {}
 
-@app.get("/api/status")
-async def get_status():
-    groups_info = {}
-    for group_id, locations in group_locations.items():
-        groups_info[group_id] = len(locations)
-    
+# เส้นทางย้อนหลังของแต่ละคน (ring buffer ขนาดคงที่ต่อคน) ใช้วาดเส้นบนแผนที่ ดู service/location_history.py
+# เก็บใน memory ของ process เท่านั้น ถ้า LOCATION_STORE=redis (หลาย worker) แต่ละ worker จะเห็นแค่บางส่วน จึงปิดไว้
+HISTORY_ENABLED = LOCATION_STORE == "memory"
+history = LocationHistory()
+
+# ใครอยู่ใกล้ใคร และใครอยู่ที่จุดไหนในแผนเที่ยววันนี้ (คำนวณที่ server ตอน update_location) ดู service/proximity.py
+# ProximityIndex อยู่ใน memory ของ process ถ้า LOCATION_STORE=redis สมาชิกคนละ worker จะไม่เห็นกัน จึงปิด member_nearby ไว้
+# (geofence เทียบกับจุดในแผนของ group ทีละคน ใช้ได้ทุกโหมด)
+PROXIMITY_ENABLED = LOCATION_STORE == "memory"
+proximity = ProximityIndex()
+geofences = GeofenceTracker()
+
+
+def encoding_room(group_id: str, encoding: str) -> str:
+    """room ย่อยของ group แยกตามรูปแบบข้อมูล เพื่อ encode frame ครั้งเดียวต่อรูปแบบ"""
+    return f"{group_id}#{encoding}"
+
+
+def pack_locations(kind: int, locations) -> bytes:
+    return encode_frame(kind, ((l['index'], l['lat'], l['lng'], l['updated_ts']) for l in locations))
+
+
+async def broadcast_pending():
+    """ส่ง location ที่ค้างอยู่ของแต่ละ group เป็น frame เดียว ('group_locations')"""
+    if not pending_locations:
+        return
+    batches = list(pending_locations.items())
+    pending_locations.clear()
+    for group_id, locations in batches:
+        locations = list(locations.values())
+        await sio.emit('group_locations', locations, room=encoding_room(group_id, 'json'))
+        # encode แบบ packed เฉพาะ group ที่มีคนขอ (นับรวมทุก worker ใน store)
+        if await store.packed_member_count(group_id):
+            await sio.emit('group_locations', pack_locations(KIND_LOCATIONS, locations), room=encoding_room(group_id, 'packed'))
+
+
+# ลำดับ field ของแต่ละแถวใน group_snapshot (ส่งเป็น array แทน dict ที่ต้องซ้ำ key ทุกคน)
+SNAPSHOT_FIELDS = ('sid', 'username', 'lat', 'lng', 'timestamp', 'updated_at')
+
+
+def encode_snapshot(group_id: str, locations: Dict[str, dict]) -> dict:
     return {
+        'group_id': group_id,
+        'fields': SNAPSHOT_FIELDS,
+        'members': [[location.get(field) for field in SNAPSHOT_FIELDS] for location in locations.values()]
+    }
+
+
+async def broadcast_loop():
+    while True:
+        await asyncio.sleep(BROADCAST_INTERVAL)
+        try:
+            await broadcast_pending()
+        except Exception as e:
+            print(f"⚠️ Broadcast error: {e}")
+
+async def evict_stale_locations():
+    """ลบ location ของคนที่เงียบไปนานเกิน LOCATION_TTL_SECONDS (แอปค้าง/เน็ตหลุดโดยไม่ disconnect)"""
+    cutoff = time.time() - LOCATION_TTL_SECONDS
+    evicted = await store.evict_stale(cutoff)
+    history.evict_stale(cutoff)
+    for group_id, sid in evicted:
+        await notify_left_area(sid, proximity.remove(sid))
+        geofences.remove(sid)
+        if group_id in pending_locations:
+            pending_locations[group_id].pop(sid, None)
+            if not pending_locations[group_id]:
+                del pending_locations[group_id]
+        await sio.emit('location_expired', {'sid': sid}, room=group_id)
+    if evicted:
+        print(f"🧹 Evicted {len(evicted)} stale location(s)")
+
+
+async def evict_dead_members():
+    """ต่ออายุ heartbeat ของ socket ใน process นี้ แล้วลบสมาชิกที่ไม่มีใครต่ออายุให้ (worker ที่ถือ socket crash ไป)
+    ไม่งั้นยังนับรวมใน MAX_GROUP_MEMBERS และค้างใน store ไปเรื่อยๆ เพราะไม่มี disconnect มาลบ
+    """
+    now = time.time()
+    await store.touch_members(local_members, now)
+    evicted = await store.evict_dead_members(now - MEMBER_TTL_SECONDS)
+    for sid, member in evicted:
+        await forget_member(sid, member['group_id'], member['username'])
+    if evicted:
+        print(f"🧹 Evicted {len(evicted)} dead member(s)")
+
+
+async def sweep_loop():
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        try:
+            await evict_dead_members()
+            await evict_stale_locations()
+            for group_id in list(geofences.stops):
+                if await store.group_member_count(group_id) == 0:
+                    geofences.drop_group(group_id)
+                else:
+                    # ข้ามวัน/แผนถูกแก้ -> โหลดจุดของวันนี้ใหม่
+                    await load_geofences(group_id)
+        except Exception as e:
+            print(f"⚠️ Sweep error: {e}")
+
+
+async def load_geofences(group_id: str):
+    """โหลดจุดที่มี lat/lng ของวันนี้จาก ScheduleSlot ของ group (room เป็น trip_id เมื่อเปิด auth)"""
+    if not group_id.isdigit() or not db.is_connected() or not geofences.needs_load(group_id):
+        return
+    try:
+        slots = await db.scheduleslot.find_many(where={
+            "tripPlan": {"tripGroup": {"trip_id": int(group_id)}},
+            "date": datetime.combine(date.today(), dt_time.min),
+            "lat": {"not": None},
+            "lng": {"not": None}
+        })
+    except Exception as e:
+        print(f"⚠️ Load itinerary error: {e}")
+        return
+    geofences.set_stops(group_id, [stop_from_slot(slot) for slot in slots])
+
+
+async def notify_left_area(sid: str, others):
+    for other in others:
+        await sio.emit('member_left_area', {'sid': sid}, to=other)
+        await sio.emit('member_left_area', {'sid': other}, to=sid)
+
+
+async def emit_proximity(group_id: str, sid: str, username: str, lat: float, lng: float):
+    """ส่ง member_nearby / member_left_area ให้ทั้งสองฝั่ง และ geofence_alert ให้ทั้ง group"""
+    if PROXIMITY_ENABLED:
+        entered, left = proximity.update(group_id, sid, lat, lng)
+        for other, distance in entered:
+            other_member = await store.get_member(other)
+            other_name = other_member['username'] if other_member else None
+            await sio.emit('member_nearby', {'sid': other, 'username': other_name, 'distance_m': round(distance)}, to=sid)
+            await sio.emit('member_nearby', {'sid': sid, 'username': username, 'distance_m': round(distance)}, to=other)
+        await notify_left_area(sid, left)
+
+    stops_entered, stops_exited = geofences.update(group_id, sid, lat, lng)
+    for event, stops in (('enter', stops_entered), ('exit', stops_exited)):
+        for stop in stops:
+            await sio.emit('geofence_alert', {
+                'type': event,
+                'sid': sid,
+                'username': username,
+                'stop': {k: stop[k] for k in ('id', 'name', 'activity', 'time', 'lat', 'lng')}
+            }, room=group_id)
+
+@router.get("/api/status")
+async def get_status():
+    stats = await store.stats()
+    memory = await store.memory_stats()
+    memory["pending_locations"] = sum(len(locations) for locations in pending_locations.values())
+    memory.update(history.memory_stats())
+    try:
+        import resource
+        # ru_maxrss บน Linux เป็น KB
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        memory["process_max_rss_kb"] = usage.ru_maxrss
+        # เวลา CPU สะสมของ process (bench/location_load.py เอาไปคิด % CPU)
+        memory["process_cpu_seconds"] = usage.ru_utime + usage.ru_stime
+    except ImportError:
+        pass
+
+    status = {
         "status": "online",
-        "total_users": len(user_groups),
-        "groups": groups_info,
-        # (Optional) ดูรายชื่อคนทั้งหมดเพื่อ debug
-        "users_list": list(user_names.values()) 
+        "total_users": stats["total_users"],
+        "total_groups": len(stats["groups"]),
+        "memory": memory
+    }
+    if not AUTH_REQUIRED:
+        # รายชื่อ/group id ให้ดูเฉพาะตอนปิด auth ทดสอบในเครื่อง (เปิด auth แล้ว username คือชื่อจริงของลูกค้า group id คือ code เข้ากลุ่ม)
+        status["groups"] = stats["groups"]
+        status["users_list"] = stats["users_list"]
+    return status
+
+@router.get("/api/groups/{group_id}/trajectories")
+async def get_trajectories(
+    group_id: str,
+    request: Request,
+    since: Optional[float] = Query(None, description="เอาเฉพาะจุดหลังเวลานี้ (epoch วินาที)"),
+    tolerance: float = Query(0, ge=0, le=1000, description="ลดจำนวนจุด (Douglas-Peucker) เมตร, 0 = ส่งทุกจุด")
+):
+    if AUTH_REQUIRED:
+        auth = request.headers.get("Authorization", "")
+        token = auth.split(" ")[1] if auth.startswith("Bearer ") else None
+        authorized, error = await authorize_group(token, group_id)
+        if error:
+            raise HTTPException(status_code=401 if error == "Unauthorized" else 403, detail=error)
+        group_id = authorized[0]
+
+    if not HISTORY_ENABLED:
+        raise HTTPException(
+            status_code=501,
+            detail="Trajectories are only available with LOCATION_STORE=memory (history is kept per process)"
+        )
+
+    return {
+        "group_id": group_id,
+        "trajectories": history.trajectories(group_id, since, tolerance)
     }
 
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
     client_ip = environ.get('REMOTE_ADDR', 'unknown')
     print(f'✅ Client connected: {sid} from {client_ip}')
 
+    # จำ token ไว้ใน session (ส่งมาทาง auth ของ socket.io หรือ header Authorization)
+    token = (auth or {}).get('token')
+    header = environ.get('HTTP_AUTHORIZATION', '')
+    if not token and header.startswith('Bearer '):
+        token = header.split(' ')[1]
+    if token:
+        await sio.save_session(sid, {'token': token})
+
+
+async def authorize_join(sid, group_id: str, data: dict):
+    token = data.get('token')
+    if not token:
+        token = (await sio.get_session(sid)).get('token')
+    return await authorize_group(token, group_id)
+
+
+async def authorize_group(token: Optional[str], group_id: str):
+    """ตรวจ JWT + สมาชิกภาพจาก cache คืนค่า (room, username) หรือ error message"""
+    customer = await membership_cache.resolve_token(token)
+    if not customer:
+        return None, "Unauthorized"
+
+    trip_id = await membership_cache.resolve_trip_id(group_id)
+    if trip_id is None or not await membership_cache.is_member(trip_id, customer['customer_id']):
+        return None, "Not a member of this group"
+
+    # ใช้ trip_id เป็นชื่อ room เสมอ ไม่ว่า client จะส่ง code หรือ id มา
+    return (str(trip_id), customer['name']), None
+
 @sio.event
 async def disconnect(sid):
     print(f'❌ Client disconnected: {sid}')
-    if sid in user_groups:
-        group_id = user_groups[sid]
-        await handle_leave_group(sid, group_id)
+    member = await store.get_member(sid)
+    if member:
+        await handle_leave_group(sid, member['group_id'])
 
 async def handle_leave_group(sid, group_id):
     """ฟังก์ชันช่วยสำหรับออกจาก group"""
     await sio.leave_room(sid, group_id)
-    
-    # ดึงชื่อมาก่อนลบ เพื่อเอาไปแจ้งเตือนคนอื่น
-    username = user_names.get(sid, 'Unknown')
-
-    # [แก้ไข] ลบข้อมูล group และ username
-    if sid in user_groups:
-        del user_groups[sid]
-    
-    if sid in user_names:
-        del user_names[sid]
-    
-    if group_id in group_locations and sid in group_locations[group_id]:
-        del group_locations[group_id][sid]
-        if not group_locations[group_id]:
-            del group_locations[group_id]
-    
+    for encoding in ENCODINGS:
+        await sio.leave_room(sid, encoding_room(group_id, encoding))
+
+    # [แก้ไข] ลบข้อมูล group, username และ location (ได้ชื่อกลับมาเพื่อเอาไปแจ้งเตือนคนอื่น)
+    member = await store.remove_member(sid)
+    await forget_member(sid, group_id, member['username'] if member else 'Unknown')
+
+
+async def forget_member(sid, group_id, username):
+    """ล้างข้อมูลของ sid ใน process นี้ (ออกจาก store ไปแล้ว) แล้วแจ้งคนอื่นใน group"""
+    local_members.discard(sid)
+    history.drop(group_id, sid)
+    await notify_left_area(sid, proximity.remove(sid))
+    geofences.remove(sid)
+
+    if group_id in pending_locations:
+        pending_locations[group_id].pop(sid, None)
+        if not pending_locations[group_id]:
+            del pending_locations[group_id]
+
     # แจ้งคนอื่นใน group ว่าใครออก
     await sio.emit('user_left', {
-        'sid': sid, 
+        'sid': sid,
         'username': username
     }, room=group_id)
-    
+
     print(f'   User {username} ({sid}) left group {group_id}')
 
 @sio.event
@@ -86,92 +375,142 @@ async def join_group(sid, data):
     group_id = data.get('group_id', '').strip()
     # [ใหม่] รับค่า username ถ้าไม่มีให้ใช้ sid ย่อๆ แทน
     username = data.get('username', f'User-{sid[:4]}').strip()
-    
+    encoding = data.get('encoding', 'json')
+
     if not group_id:
         return {"status": "error", "message": "Invalid group ID"}
-    
+    if encoding not in ENCODINGS:
+        return {"status": "error", "message": f"Unsupported encoding: {encoding}"}
+
+    if AUTH_REQUIRED:
+        authorized, error = await authorize_join(sid, group_id, data)
+        if error:
+            return {"status": "error", "message": error}
+        group_id, name = authorized
+        username = name or username
+
     print(f'📥 {username} ({sid}) joining group: {group_id}')
-    
+
     # ถ้าอยู่ group เดิมให้ออกก่อน
-    if sid in user_groups:
-        old_group = user_groups[sid]
-        if old_group != group_id:
-            await handle_leave_group(sid, old_group)
-    
-    await sio.enter_room(sid, group_id)
-    
+    member = await store.get_member(sid)
+    already_in_group = member is not None and member['group_id'] == group_id
+    # เช็คก่อนแบบคร่าวๆ จะได้ไม่ต้องออกจาก group เดิมถ้า group ใหม่เต็มแน่ๆ (add_member เช็คซ้ำแบบ atomic อีกที)
+    if not already_in_group and await store.group_member_count(group_id) >= MAX_GROUP_MEMBERS:
+        return {"status": "error", "message": "Group is full"}
+    if member and not already_in_group:
+        await handle_leave_group(sid, member['group_id'])
+
     # [แก้ไข] บันทึกทั้ง Group ID และ Username
-    user_groups[sid] = group_id
-    user_names[sid] = username
-    
-    if group_id not in group_locations:
-        group_locations[group_id] = {}
-    
-    # ส่ง location ของคนอื่นให้คนใหม่ (คนใหม่จะเห็นชื่อคนเก่าเพราะข้อมูลมี username แล้ว)
-    # existing_locations = list(group_locations[group_id].values())
-    # await sio.emit('group_locations', existing_locations, to=sid)
-
-    current_users = group_locations.get(group_id, {})
-    for other_sid, location_data in current_users.items():
-        if other_sid != sid:
-            await sio.emit('location_update', location_data, to=sid)
-            print(f"Sent stored location of {location_data.get('username')} to {sid}")
-    
-    # แจ้งคนอื่นว่ามีคนใหม่เข้ามา พร้อมชื่อ
+    index = await store.add_member(sid, group_id, username, encoding, MAX_GROUP_MEMBERS)
+    if index is None:
+        return {"status": "error", "message": "Group is full"}
+    local_members.add(sid)
+
+    await sio.enter_room(sid, group_id)
+    for other in ENCODINGS:
+        if other != encoding:
+            await sio.leave_room(sid, encoding_room(group_id, other))
+    await sio.enter_room(sid, encoding_room(group_id, encoding))
+    await load_geofences(group_id)
+
+    # ส่ง location ของคนอื่นให้คนใหม่ทีเดียว (แทนการ emit ทีละคน)
+    current_users = await store.get_group_locations(group_id)
+    current_users.pop(sid, None)
+    if encoding == 'packed':
+        snapshot = pack_locations(KIND_SNAPSHOT, current_users.values())
+    else:
+        snapshot = encode_snapshot(group_id, current_users)
+    await sio.emit('group_snapshot', snapshot, to=sid)
+    print(f"Sent snapshot of {len(current_users)} member(s) to {sid}")
+
+    # แจ้งคนอื่นว่ามีคนใหม่เข้ามา พร้อมชื่อ (index ใช้ถอด frame แบบ packed)
     await sio.emit('user_joined', {
         'sid': sid,
         'username': username,
-        'group_id': group_id
+        'group_id': group_id,
+        'index': index
     }, room=group_id, skip_sid=sid)
-    
-    return {
+
+    response = {
         "status": "success",
         "group_id": group_id,
         "username": username,
-        "members_count": len(group_locations[group_id]) + 1 # +1 ตัวเองที่เพิ่งเข้า (ถ้ายังไม่ส่ง loc จะยังไม่มีใน dict)
+        "encoding": encoding,
+        "index": index,
+        "members_count": await store.group_member_count(group_id)
     }
+    if encoding == 'packed':
+        # ตาราง member index ของทั้ง group: [[index, sid, username], ...]
+        members = await store.group_index(group_id)
+        response["members"] = [[m["index"], other_sid, m["username"]] for other_sid, m in members.items()]
+    return response
 
 @sio.event
 async def leave_group(sid, data):
-    if sid not in user_groups:
+    member = await store.get_member(sid)
+    if not member:
         return {"status": "error", "message": "Not in any group"}
-    
-    group_id = user_groups[sid]
-    await handle_leave_group(sid, group_id)
+
+    await handle_leave_group(sid, member['group_id'])
     return {"status": "success"}
 
 @sio.event
 async def update_location(sid, data):
-    if sid not in user_groups:
+    member = await store.get_member(sid)
+    if not member:
         return {"status": "error", "message": "Not in any group"}
-    
-    group_id = user_groups[sid]
+
+    group_id = member['group_id']
     # [ใหม่] ดึงชื่อผู้ใช้มาด้วย
-    username = user_names.get(sid, 'Unknown')
+    username = member['username']
 
     lat = data.get('lat')
     lng = data.get('lng')
-    
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return {"status": "error", "message": "Invalid lat/lng"}
+
+    previous = await store.get_location(group_id, sid)
+    if previous and haversine_m(previous['lat'], previous['lng'], lat, lng) < MIN_MOVE_METERS:
+        # ขยับนิดเดียว ไม่ต้องส่งให้คนอื่น แค่อัปเดตเวลาว่ายังออนไลน์อยู่
+        previous['timestamp'] = data.get('timestamp')
+        previous['updated_at'] = datetime.now().isoformat()
+        previous['updated_ts'] = time.time()
+        await store.set_location(group_id, sid, previous)
+        return {
+            "status": "unchanged",
+            "username": username
+        }
+
     # [แก้ไข] เพิ่ม username เข้าไปใน object ที่จะเก็บและส่ง
     location_data = {
         'sid': sid,
+        'index': member['index'],
         'username': username,
         'lat': lat,
         'lng': lng,
         'timestamp': data.get('timestamp'),
-        'updated_at': datetime.now().isoformat()
+        'updated_at': datetime.now().isoformat(),
+        'updated_ts': time.time()
     }
-    
-    group_locations[group_id][sid] = location_data
-    
-    # Broadcast
-    await sio.emit('location_update', location_data, room=group_id, skip_sid=sid)
-    
+
+    await store.set_location(group_id, sid, location_data)
+    if HISTORY_ENABLED:
+        history.record(group_id, sid, username, lat, lng, location_data['updated_ts'])
+    await emit_proximity(group_id, sid, username, lat, lng)
+
+    # รอส่งพร้อมกันใน broadcast_loop (แทนการ emit ทุกครั้งที่ได้ GPS)
+    pending_locations.setdefault(group_id, {})[sid] = location_data
+
     return {
         "status": "received",
         "username": username
     }
 
+# รันแยก (standalone): python get_location.py -> port 8010
+app = FastAPI(lifespan=lifespan)
+app.include_router(router)
+socket_app = socketio.ASGIApp(sio, app)
+
 if __name__ == '__main__':
     print("="*60)
     print("🚀 Socket.IO Server with Group System")
@@ -184,5 +523,11 @@ if __name__ == '__main__':
     print("   - join_group: เข้า group")
     print("   - leave_group: ออกจาก group")
     print("   - update_location: ส่ง location (ต้องอยู่ใน group)")
+    print("   - group_snapshot: location ของทุกคนใน group ส่งให้ตอน join ครั้งเดียว")
+    print("   - join_group({encoding: 'packed'}): รับ group_locations/group_snapshot เป็น binary frame")
+    print("   - GET /api/groups/{group_id}/trajectories: เส้นทางย้อนหลังของสมาชิก")
+    print("   - member_nearby / member_left_area: สมาชิกเข้ามาใกล้/ออกห่าง (%d ม.)" % proximity.radius_m)
+    print("   - geofence_alert: สมาชิกเข้า/ออกจุดในแผนเที่ยววันนี้")
+    print("   - group_locations: location ของสมาชิกที่ขยับ ส่งเป็นชุดทุก %.1f วินาที" % BROADCAST_INTERVAL)
     print("="*60)
-    uvicorn.run(socket_app, host='0.0.0.0', port=8010, log_level="warning")
\ No newline at end of file
+    uvicorn.run(socket_app, host='0.0.0.0', port=8010, log_level="warning")
@@ -14,23 +14,42 @@ from openai import OpenAI
 from contextlib import asynccontextmanager
 import subprocess
 import sys
+import socketio
 
 from routers import auth, customer, trip_group, budget, trip_plan, ai, cache
 from dependencies import load_cities_data, get_cities_list, cities_data, SECRET_KEY, ALGORITHM, get_db
 from db import db
+from service.cache_refresher import start_cache_refresher, stop_cache_refresher
+from service.change_feed import change_feed
 
 import os
 
 load_dotenv()
 
+# รวม location server (Socket.IO) ไว้ใน process เดียวกับ API (ค่าเริ่มต้น)
+# ตั้ง LOCATION_EMBEDDED=0 ถ้าอยากรัน get_location.py แยกเป็นอีก process แบบเดิม (port 8010)
+LOCATION_EMBEDDED = os.getenv("LOCATION_EMBEDDED", "1") == "1"
+if LOCATION_EMBEDDED:
+    # import เฉพาะตอนรวม process เพราะ import แล้วจะสร้าง Redis client / Socket.IO manager ทันที
+    import get_location
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- startup ---
     load_cities_data()
     await db.connect()
+    start_cache_refresher()
+    change_feed.start()
+    if LOCATION_EMBEDDED:
+        # ใช้ db และ membership cache ตัวเดียวกับ API
+        await get_location.start_location_server()
     yield
     # --- shutdown ---
+    if LOCATION_EMBEDDED:
+        await get_location.stop_location_server()
+    await change_feed.stop()
+    await stop_cache_refresher()
     await db.disconnect()
     cities_data.clear()
     
@@ -39,21 +58,24 @@ app = FastAPI(lifespan=lifespan)
 
 
 if __name__ == "__main__":
-    # สั่งรัน get_location.py แบบ Background process
-    # sys.executable คือตัวระบุว่าให้ใช้ python ตัวเดียวกับที่รัน main.py
-    process = subprocess.Popen([sys.executable, "get_location.py"])
+    process = None
+    if not LOCATION_EMBEDDED:
+        # สั่งรัน get_location.py แบบ Background process
+        # sys.executable คือตัวระบุว่าให้ใช้ python ตัวเดียวกับที่รัน main.py
+        process = subprocess.Popen([sys.executable, "get_location.py"])
+        print("Starting get_location.py...")
     
     try:
-        print("Starting get_location.py...")
-        # รัน Server
-        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+        # รัน Server (socket_app = API + Socket.IO ถ้า LOCATION_EMBEDDED)
+        uvicorn.run("main:socket_app", host="0.0.0.0", port=8000, reload=True)
     except KeyboardInterrupt:
         # (Optional) จัดการตอนกด Ctrl+C เพื่อปิด get_location.py ด้วยถ้าจำเป็น
         pass
     finally:
         # สั่งปิด get_location.py เมื่อ main.py หยุดทำงาน
-        process.terminate()
-        print("Stopped get_location.py")
+        if process:
+            process.terminate()
+            print("Stopped get_location.py")
 # class for request model
 
 
@@ -70,7 +92,10 @@ app.add_middleware(
 @app.middleware("http")
 async def jwt_middleware(request: Request, call_next):
     
-    if request.url.path in ["/login", "/register", "/refresh-token", "/google-login", "/cities", "/explore-cities", "/attractions/", "/attractions/{id}"]:   
+    if request.url.path in ["/login", "/register", "/refresh-token", "/google-login", "/cities", "/explore-cities"]:   
+        return await call_next(request)
+    # /attractions/, /attractions/{id}, /attractions/{id}/photo เปิดให้ดูได้โดยไม่ต้อง login
+    if request.url.path.startswith("/attractions/"):
         return await call_next(request)
 
     auth = request.headers.get("Authorization")
@@ -106,9 +131,15 @@ app.include_router(budget.router)
 app.include_router(trip_plan.router)
 app.include_router(ai.router)
 app.include_router(cache.router)
+if LOCATION_EMBEDDED:
+    app.include_router(get_location.router)
 
 
 @app.get("/cities")
 def get_cities():
     data = get_cities_list()
     return {"items": [c.model_dump() for c in data], "total": len(data)}
+
+
+# ASGI app ที่ uvicorn รัน: /socket.io/ ไปที่ location server ที่เหลือไปที่ FastAPI
+socket_app = socketio.ASGIApp(get_location.sio, other_asgi_app=app) if LOCATION_EMBEDDED else app
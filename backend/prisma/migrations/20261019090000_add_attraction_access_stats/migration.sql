@@ -0,0 +1,11 @@
+-- AlterTable
+ALTER TABLE "CacheAttraction" ADD COLUMN     "hit_count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "last_accessed_at" TIMESTAMP(3),
+ADD COLUMN     "popularity" DOUBLE PRECISION NOT NULL DEFAULT 0,
+ADD COLUMN     "refresh_after" TIMESTAMP(3);
+
+-- Backfill: keep the old fixed 7-day expiry for rows that were already fetched
+UPDATE "CacheAttraction" SET "refresh_after" = "last_fetched_at" + INTERVAL '7 days' WHERE "last_fetched_at" IS NOT NULL;
+
+-- CreateIndex
+CREATE INDEX "CacheAttraction_refresh_after_idx" ON "CacheAttraction"("refresh_after");
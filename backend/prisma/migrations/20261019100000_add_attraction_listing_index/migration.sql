@@ -0,0 +1,8 @@
+-- CreateIndex
+CREATE INDEX "CacheAttraction_rating_attraction_id_idx" ON "CacheAttraction"("rating" DESC, "attraction_id" DESC);
+
+-- CreateIndex
+CREATE INDEX "CacheAttraction_city_id_rating_attraction_id_idx" ON "CacheAttraction"("city_id", "rating" DESC, "attraction_id" DESC);
+
+-- CreateIndex
+CREATE INDEX "CacheAttraction_place_types_idx" ON "CacheAttraction" USING GIN ("place_types");
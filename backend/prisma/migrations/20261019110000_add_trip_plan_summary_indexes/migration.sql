@@ -0,0 +1,5 @@
+-- CreateIndex
+CREATE INDEX "TripPlan_creator_id_start_plan_date_plan_id_idx" ON "TripPlan"("creator_id", "start_plan_date" DESC, "plan_id" DESC);
+
+-- CreateIndex
+CREATE INDEX "GroupMember_trip_id_idx" ON "GroupMember"("trip_id");
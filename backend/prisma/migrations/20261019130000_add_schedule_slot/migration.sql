@@ -0,0 +1,55 @@
+-- CreateTable
+CREATE TABLE "ScheduleSlot" (
+    "slot_id" SERIAL NOT NULL,
+    "plan_id" INTEGER NOT NULL,
+    "day_index" INTEGER NOT NULL,
+    "position" INTEGER NOT NULL,
+    "date" DATE,
+    "time" VARCHAR(10),
+    "activity" TEXT NOT NULL,
+    "location_name" VARCHAR(255),
+    "lat" DOUBLE PRECISION,
+    "lng" DOUBLE PRECISION,
+
+    CONSTRAINT "ScheduleSlot_pkey" PRIMARY KEY ("slot_id")
+);
+
+-- CreateIndex
+CREATE INDEX "ScheduleSlot_plan_id_day_index_position_idx" ON "ScheduleSlot"("plan_id", "day_index", "position");
+
+-- CreateIndex
+CREATE INDEX "ScheduleSlot_date_idx" ON "ScheduleSlot"("date");
+
+-- ค้นหาชื่อสถานที่แบบ contains/insensitive (ILIKE '%x%') btree ใช้ไม่ได้ ต้องเป็น trigram GIN
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+
+-- CreateIndex
+CREATE INDEX "ScheduleSlot_location_name_idx" ON "ScheduleSlot" USING GIN ("location_name" gin_trgm_ops);
+
+-- AddForeignKey
+ALTER TABLE "ScheduleSlot" ADD CONSTRAINT "ScheduleSlot_plan_id_fkey" FOREIGN KEY ("plan_id") REFERENCES "TripPlan"("plan_id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill จาก payload เดิม (บางแถวเก็บเป็น JSON string ซ้อนอีกชั้น)
+INSERT INTO "ScheduleSlot" ("plan_id", "day_index", "position", "date", "time", "activity", "location_name", "lat", "lng")
+SELECT
+    s."plan_id",
+    d.ord - 1,
+    a.ord - 1,
+    CASE WHEN d.day->>'date' ~ '^\d{4}-\d{2}-\d{2}' THEN substring(d.day->>'date' FROM 1 FOR 10)::date END,
+    LEFT(a.slot->>'time', 10),
+    COALESCE(a.slot->>'activity', ''),
+    LEFT(a.slot->>'specific_location_name', 255),
+    CASE WHEN jsonb_typeof(a.slot->'lat') = 'number' THEN (a.slot->>'lat')::double precision END,
+    CASE WHEN jsonb_typeof(a.slot->'lng') = 'number' THEN (a.slot->>'lng')::double precision END
+FROM (
+    SELECT "plan_id",
+           CASE WHEN jsonb_typeof("payload") = 'string' THEN ("payload" #>> '{}')::jsonb ELSE "payload" END AS doc
+    FROM "TripSchedule"
+) s
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN jsonb_typeof(s.doc->'itinerary') = 'array' THEN s.doc->'itinerary' ELSE '[]'::jsonb END
+) WITH ORDINALITY AS d(day, ord)
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN jsonb_typeof(d.day->'schedule') = 'array' THEN d.day->'schedule' ELSE '[]'::jsonb END
+) WITH ORDINALITY AS a(slot, ord)
+WHERE jsonb_typeof(a.slot) = 'object';
@@ -0,0 +1,83 @@
+-- ส่ง NOTIFY "trip_changes" ทุกครั้งที่ข้อมูลของทริปเปลี่ยน (service/change_feed.py เป็นคนฟัง)
+-- payload: {"table", "op", "trip_id", "plan_id", "id", ...} เล็กๆ ไม่ส่งทั้งแถว
+CREATE OR REPLACE FUNCTION notify_trip_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+    v_trip_id integer;
+    v_plan_id integer;
+    v_id integer;
+    extra jsonb := '{}'::jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+
+    IF TG_TABLE_NAME = 'TripGroup' THEN
+        v_trip_id := (row_data->>'trip_id')::integer;
+        v_plan_id := (row_data->>'plan_id')::integer;
+        v_id := v_trip_id;
+    ELSIF TG_TABLE_NAME = 'TripPlan' THEN
+        v_plan_id := (row_data->>'plan_id')::integer;
+        v_id := v_plan_id;
+        SELECT "trip_id" INTO v_trip_id FROM "TripGroup" WHERE "plan_id" = v_plan_id;
+    ELSIF TG_TABLE_NAME = 'TripSchedule' THEN
+        v_plan_id := (row_data->>'plan_id')::integer;
+        v_id := (row_data->>'schedule_id')::integer;
+        extra := jsonb_build_object('version', row_data->'version');
+        SELECT "trip_id" INTO v_trip_id FROM "TripGroup" WHERE "plan_id" = v_plan_id;
+    ELSIF TG_TABLE_NAME = 'GroupMember' THEN
+        v_trip_id := (row_data->>'trip_id')::integer;
+        v_id := (row_data->>'group_member_id')::integer;
+        extra := jsonb_build_object('customer_id', row_data->'customer_id');
+    ELSIF TG_TABLE_NAME = 'Budget' THEN
+        v_id := (row_data->>'budget_id')::integer;
+        v_trip_id := (row_data->>'trip_id')::integer;
+        v_plan_id := (row_data->>'plan_id')::integer;
+        IF v_trip_id IS NULL AND v_plan_id IS NOT NULL THEN
+            SELECT "trip_id" INTO v_trip_id FROM "TripGroup" WHERE "plan_id" = v_plan_id;
+        END IF;
+    ELSIF TG_TABLE_NAME = 'Expense' THEN
+        v_id := (row_data->>'expense_id')::integer;
+        extra := jsonb_build_object('budget_id', row_data->'budget_id');
+        SELECT b."trip_id", b."plan_id" INTO v_trip_id, v_plan_id FROM "Budget" b WHERE b."budget_id" = (row_data->>'budget_id')::integer;
+        IF v_trip_id IS NULL AND v_plan_id IS NOT NULL THEN
+            SELECT "trip_id" INTO v_trip_id FROM "TripGroup" WHERE "plan_id" = v_plan_id;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('trip_changes', (jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'trip_id', v_trip_id,
+        'plan_id', v_plan_id,
+        'id', v_id
+    ) || extra)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "TripGroup_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "TripGroup"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
+
+-- CreateTrigger
+CREATE TRIGGER "TripPlan_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "TripPlan"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
+
+-- CreateTrigger
+CREATE TRIGGER "TripSchedule_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "TripSchedule"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
+
+-- CreateTrigger
+CREATE TRIGGER "GroupMember_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "GroupMember"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
+
+-- CreateTrigger
+CREATE TRIGGER "Budget_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "Budget"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
+
+-- CreateTrigger
+CREATE TRIGGER "Expense_notify_change" AFTER INSERT OR UPDATE OR DELETE ON "Expense"
+    FOR EACH ROW EXECUTE FUNCTION notify_trip_change();
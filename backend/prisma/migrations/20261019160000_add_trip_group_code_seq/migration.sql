@@ -0,0 +1,30 @@
+-- เลขลำดับสำหรับสร้าง TripGroup.uniqueCode (trip_group_code() แปลงเป็น base32 แบบสลับลำดับ)
+CREATE SEQUENCE IF NOT EXISTS "trip_group_code_seq" START WITH 1 MAXVALUE 1099511627775 NO CYCLE;
+
+-- Feistel 4 รอบบน 40 bit (1 ต่อ 1 เสมอ: เลขต่างกัน -> code ต่างกัน แต่ดูไม่เรียงกัน)
+-- แล้วเข้ารหัสเป็น Crockford base32 8 ตัว (ไม่มี I L O U)
+-- key มาจาก service/group_code.py ทำใน DB ได้เลยเพื่อให้ INSERT ใช้ nextval ใน statement เดียว
+CREATE OR REPLACE FUNCTION trip_group_code(n BIGINT, key TEXT) RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    alphabet CONSTANT TEXT := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+    half_mask CONSTANT BIGINT := 1048575;
+    v BIGINT := n & 1099511627775;
+    l BIGINT := (v >> 20) & half_mask;
+    r BIGINT := v & half_mask;
+    t BIGINT;
+    code TEXT := '';
+BEGIN
+    FOR i IN 0..3 LOOP
+        t := r;
+        r := l # (('x' || substr(md5(key || ':' || i || ':' || t), 1, 8))::bit(32)::bigint & half_mask);
+        l := t;
+    END LOOP;
+    v := (l << 20) | r;
+    FOR i IN 1..8 LOOP
+        code := substr(alphabet, (v & 31)::int + 1, 1) || code;
+        v := v >> 5;
+    END LOOP;
+    RETURN code;
+END;
+$$;
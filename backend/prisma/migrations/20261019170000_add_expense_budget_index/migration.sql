@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Expense_budget_id_create_at_idx" ON "Expense"("budget_id", "create_at");
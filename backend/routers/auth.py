@@ -9,6 +9,7 @@ from schemas import GoogleLoginRequest
 import secrets
 
 from dependencies import get_db, create_access_token, create_refresh_token, SECRET_KEY, ALGORITHM
+from service.membership_cache import membership_cache
 from schemas import Customer, CustomerLogin, CustomerOut, TokenRefreshRequest, GoogleLoginRequest
 import os
 
@@ -174,6 +175,7 @@ async def logout(request: Request, db: Prisma = Depends(get_db)):
         where={"email": email},
         data={"currentToken": None, "refreshToken": None}
     )
+    membership_cache.invalidate_email(email)
     return {"detail": "Logged out successfully"}
 
 @router.get("/user")
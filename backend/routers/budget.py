@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from prisma import Prisma
-from dependencies import get_db
+from datetime import datetime
+from typing import Optional
+from dependencies import get_db, encode_cursor, decode_cursor
 from schemas import Budget, BudgetUpdate, Expense
 
 router = APIRouter(tags=["Budget"])
@@ -20,6 +22,91 @@ async def read_budget_by_id(plan_id: int, db: Prisma = Depends(get_db)):
     except Exception as e:
         return {"error": str(e)}
 
+# ยอดใช้จ่ายรายวัน (ตามเวลาท้องถิ่นของ tz) คำนวณใน Postgres ไม่ต้องส่ง expense ทุกแถวไปรวมที่ client
+DAILY_SPEND_SQL = """
+SELECT ("create_at" AT TIME ZONE 'UTC' AT TIME ZONE $2)::date AS day,
+       SUM("amount") AS total,
+       COUNT(*) AS count
+FROM "Expense"
+WHERE "budget_id" = $1
+GROUP BY 1
+ORDER BY 1
+"""
+
+@router.get("/budget/plan/{plan_id}/summary")
+async def read_budget_summary(plan_id: int, tz: str = "Asia/Bangkok", db: Prisma = Depends(get_db)):
+    budget = await db.budget.find_unique(where={"plan_id": plan_id})
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+
+    categories = await db.expense.group_by(
+        by=["category"],
+        where={"budget_id": budget.budget_id},
+        sum={"amount": True},
+        count=True,
+        order={"category": "asc"}
+    )
+    try:
+        days = await db.query_raw(DAILY_SPEND_SQL, budget.budget_id, tz)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tz: {e}")
+
+    by_category = [
+        {
+            "category": row["category"],
+            "total": row["_sum"]["amount"] or 0,
+            "count": row["_count"]["_all"]
+        }
+        for row in categories
+    ]
+    spent = sum(row["total"] for row in by_category)
+    return {
+        "budget_id": budget.budget_id,
+        "plan_id": plan_id,
+        "total_budget": budget.total_budget,
+        "spent": spent,
+        "remaining": budget.total_budget - spent,
+        "expense_count": sum(row["count"] for row in by_category),
+        "by_category": by_category,
+        "by_day": [{"day": str(row["day"])[:10], "total": int(row["total"]), "count": int(row["count"])} for row in days]
+    }
+
+@router.get("/budget/{budget_id}/expenses")
+async def read_budget_expenses(
+    budget_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Prisma = Depends(get_db)
+):
+    """expense ทีละหน้า ใหม่สุดก่อน (keyset ตาม create_at DESC, expense_id DESC)"""
+    where = {"budget_id": budget_id}
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # cursor มาจาก client แก้ไขได้ ค่าผิดรูปแบบต้องตอบ 400 ไม่ใช่ 500
+        try:
+            create_at, expense_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        where["OR"] = [
+            {"create_at": {"lt": create_at}},
+            {"create_at": create_at, "expense_id": {"lt": expense_id}}
+        ]
+
+    expenses = await db.expense.find_many(
+        where=where,
+        order=[{"create_at": "desc"}, {"expense_id": "desc"}],
+        take=limit + 1
+    )
+    has_more = len(expenses) > limit
+    expenses = expenses[:limit]
+    next_cursor = None
+    if has_more:
+        last = expenses[-1]
+        next_cursor = encode_cursor(last.create_at.isoformat(), last.expense_id)
+    return {"items": expenses, "next_cursor": next_cursor}
+
 @router.post("/budget")
 async def create_budget(budget: Budget, db: Prisma = Depends(get_db)):
     try:
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
 from service.attraction import get_attraction_with_cache
-import os
+from service.explore import get_explore_snapshot
+from service.photo_cache import get_photo, photo_path, PHOTO_SIZES, DEFAULT_PHOTO_SIZE
+from dependencies import encode_cursor, decode_cursor, etag_matches
+import re
 from db import db
 
 router = APIRouter()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
 
 @router.get("/attractions/{id}")
 async def get_attraction(id: int):
@@ -13,10 +17,8 @@ async def get_attraction(id: int):
     if not attraction:
         raise HTTPException(status_code=404, detail="Not found")
     
-    # แปลง photo_ref เป็น URL รูปภาพพร้อมใช้
-    img_url = None
-    if attraction.photo_ref:
-        img_url = f"https://places.googleapis.com/v1/{attraction.photo_ref}/media?maxHeightPx=400&maxWidthPx=400&key={GOOGLE_API_KEY}"
+    # แปลง photo_ref เป็น URL รูปผ่าน proxy ของเรา (ไม่ส่ง API key ออกไปให้ client)
+    img_url = photo_path(attraction)
 
     return {
         "id": attraction.attraction_id,
@@ -27,23 +29,129 @@ async def get_attraction(id: int):
     }
 
 
+# field ที่หน้า list ใช้จริง (การ์ดหน้า Home ใช้ description ด้วย แต่ไม่ส่ง address/สถิติ cache ออกไป)
+LIST_FIELDS = ("attraction_id", "name", "rating", "review_count", "photo_ref", "place_types", "city_id", "description")
+
+def after_cursor(rating: Optional[float], attraction_id: int) -> dict:
+    """เงื่อนไข keyset ต่อจาก (rating, attraction_id) ตามลำดับ rating DESC (NULL มาก่อน), attraction_id DESC"""
+    if rating is None:
+        return {
+            "OR": [
+                {"rating": None, "attraction_id": {"lt": attraction_id}},
+                {"rating": {"not": None}}
+            ]
+        }
+    return {
+        "OR": [
+            {"rating": {"lt": rating}},
+            {"rating": rating, "attraction_id": {"lt": attraction_id}}
+        ]
+    }
+
+def parse_range(header: str, size: int):
+    """รองรับ Range แบบช่วงเดียว (bytes=start-end, bytes=start-, bytes=-suffix)"""
+    m = RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+    else:
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+@router.get("/attractions/{id}/photo")
+async def get_attraction_photo(id: int, request: Request, size: int = DEFAULT_PHOTO_SIZE):
+    if size not in PHOTO_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {list(PHOTO_SIZES)}")
+
+    attraction = await db.cacheattraction.find_unique(where={"attraction_id": id})
+    if not attraction or not attraction.photo_ref:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    photo = await get_photo(attraction.photo_ref, size)
+    if not photo:
+        raise HTTPException(status_code=502, detail="Failed to fetch photo")
+    path, digest = photo
+
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        # URL มี ?v= ตาม photo_ref อยู่แล้ว รูปเปลี่ยนเมื่อไหร่ URL ก็เปลี่ยน
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes"
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(range_header, len(data))
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(content=data[start:end + 1], status_code=206, media_type="image/jpeg", headers=headers)
+
+    return Response(content=data, media_type="image/jpeg", headers=headers)
+
 @router.get("/attractions/")
-async def get_all_attractions():
+async def get_all_attractions(
+    city_id: Optional[int] = None,
+    place_types: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    where = {}
+    if city_id is not None:
+        where["city_id"] = city_id
+    if place_types:
+        where["place_types"] = {"has_some": place_types}
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        rating, attraction_id = values
+        # cursor มาจาก client แก้ไขได้ ต้องเช็คชนิดก่อนใช้ ไม่งั้น query พังเป็น 500
+        if (rating is not None and not isinstance(rating, (int, float))) or isinstance(rating, bool) \
+                or not isinstance(attraction_id, int) or isinstance(attraction_id, bool):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        where = {"AND": [where, after_cursor(rating, attraction_id)]}
+
     attractions = await db.cacheattraction.find_many(
-        order={
-            "rating": "desc"
-        }
+        where=where,
+        order=[
+            {"rating": "desc"},
+            {"attraction_id": "desc"}
+        ],
+        take=limit + 1
     )
-    return attractions
+
+    has_more = len(attractions) > limit
+    attractions = attractions[:limit]
+    next_cursor = None
+    if has_more:
+        last = attractions[-1]
+        next_cursor = encode_cursor(last.rating, last.attraction_id)
+
+    return {
+        "items": [{field: getattr(a, field) for field in LIST_FIELDS} for a in attractions],
+        "next_cursor": next_cursor
+    }
 
 @router.get("/explore-cities")
-async def get_explore_data():
-    cities = await db.city.find_many(
-        include={
-            "attractions": {
-                "take": 5,                
-                "order_by": {"rating": "desc"} 
-            }
-        }
-    )
-    return cities
\ No newline at end of file
+async def get_explore_data(request: Request):
+    # ใช้ snapshot ใน memory แทนการ query เมือง + attraction ทุกครั้ง
+    body, etag = await get_explore_snapshot()
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,23 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from prisma import Prisma
-import string, secrets
-from dependencies import get_db, get_current_user
+from prisma.errors import UniqueViolationError
+import asyncio, json
+from dependencies import get_db, get_current_user, make_etag, etag_matches
+from service.membership_cache import membership_cache
+from service.change_feed import change_feed
+from service.group_code import next_group_code, NEXT_CODE_EXPR, GROUP_CODE_KEY
 from schemas import TripGroup, GroupMember, JoinGroupRequest
 
 router = APIRouter(tags=["Trip"])
 
-def generate_unique_code(length=8):
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(secrets.choice(characters) for _ in range(length))
-
-async def generate_unique_code_not_exists(db: Prisma, length=8) -> str:
-    for _ in range(10):
-        code = generate_unique_code(length)
-        existing = await db.tripgroup.find_unique(where={"uniqueCode": code})
-        if not existing:
-            return code
-    raise Exception("Cannot generate unique code")
+# code จาก sequence ไม่ซ้ำกันเอง แต่อาจชนกับ code แบบสุ่มของ group เก่า ให้ลองเลขถัดไป
+CODE_RETRIES = 5
 
 # --- Trip Group ---
 @router.get("/trip_group")
@@ -41,37 +36,143 @@ async def read_trip_group(db: Prisma = Depends(get_db), current_user = Depends(g
     except Exception as e:
         return {"error": str(e)}
 
+# โปรไฟล์ลูกค้าที่ส่งออกไปใน response (ตัด updatedAt/token ที่ขยับทุกครั้งที่ login ออก ไม่งั้น ETag เปลี่ยนตลอด)
+PROFILE_JSON = """(to_jsonb({alias}) - 'updatedAt' - 'currentToken' - 'refreshToken')::text"""
+
+# ค่าที่เปลี่ยนเมื่อข้อมูลใน /trip_group/{trip_id} เปลี่ยน
+# member_ids: id สมาชิกเรียงกันแล้ว md5 (SUM ของ id ชนกันได้ เช่น {1,4} กับ {2,3})
+# member_profiles: โปรไฟล์ของสมาชิกทุกคน คำนวณเฉพาะตอน include_members ($3)
+GROUP_VALIDATOR_SQL = f"""
+SELECT g."owner_id",
+       g."updatedAt" AS group_updated,
+       p."updatedAt" AS plan_updated,
+       s."version" AS schedule_version,
+       b."total_budget",
+       md5({PROFILE_JSON.format(alias='o')}) AS owner_profile,
+       (SELECT COUNT(*) FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS member_count,
+       (SELECT MAX(m."joinAt") FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS last_join,
+       (SELECT md5(string_agg(m."group_member_id"::text, ',' ORDER BY m."group_member_id"))
+        FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS member_ids,
+       CASE WHEN $3::boolean THEN (
+           SELECT md5(string_agg(m."group_member_id"::text || ':' || {PROFILE_JSON.format(alias='c')}, ',' ORDER BY m."group_member_id"))
+           FROM "GroupMember" m JOIN "Customer" c ON c."customer_id" = m."customer_id"
+           WHERE m."trip_id" = g."trip_id"
+       ) END AS member_profiles,
+       EXISTS (SELECT 1 FROM "GroupMember" m WHERE m."trip_id" = g."trip_id" AND m."customer_id" = $2) AS is_member
+FROM "TripGroup" g
+JOIN "Customer" o ON o."customer_id" = g."owner_id"
+LEFT JOIN "TripPlan" p ON p."plan_id" = g."plan_id"
+LEFT JOIN "TripSchedule" s ON s."plan_id" = g."plan_id"
+LEFT JOIN "Budget" b ON b."trip_id" = g."trip_id"
+WHERE g."trip_id" = $1
+"""
+
 @router.get("/trip_group/{trip_id}")
-async def read_trip_group_by_id(trip_id: int, db: Prisma = Depends(get_db), current_user = Depends(get_current_user)):
-    try:
-        trip_group = await db.tripgroup.find_unique(
-            where={"trip_id": trip_id},
-            include={
-                "owner": True,
-                "members": {
-                    "include": {
-                        "customer": True 
-                    }
-                },
-                "budget": True,
-                "tripPlan": {
-                    "include": {
-                        "schedules": True 
-                    }
-                }
+async def read_trip_group_by_id(
+    trip_id: int,
+    request: Request,
+    response: Response,
+    include_members: bool = False,
+    db: Prisma = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # สิทธิ์ + จำนวนสมาชิกได้จาก query เดียว (EXISTS/COUNT บน index) ไม่ต้องโหลดสมาชิกทั้งหมดมาเช็ค
+    rows = await db.query_raw(GROUP_VALIDATOR_SQL, trip_id, current_user.customer_id, include_members)
+    if not rows:
+        return {"error": "Trip not found"}
+    row = rows[0]
+    if row["owner_id"] != current_user.customer_id and not row["is_member"]:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    etag = make_etag(row, include_members)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    include = {
+        "owner": True,
+        "budget": True,
+        "tripPlan": {
+            "include": {
+                "schedules": True 
             }
-        )
-       
+        }
+    }
+    if include_members:
+        # รายชื่อสมาชิก + โปรไฟล์ ส่งเฉพาะเมื่อขอ (?include_members=true)
+        include["members"] = {"include": {"customer": True}}
+    try:
+        trip_group = await db.tripgroup.find_unique(where={"trip_id": trip_id}, include=include)
         if not trip_group:
             return {"error": "Trip not found"}
-        is_member = any(m.customer_id == current_user.customer_id for m in trip_group.members)
-        
-        if trip_group.owner_id != current_user.customer_id and not is_member:
-             raise HTTPException(status_code=403, detail="Unauthorized")
-        return trip_group
+        return {**trip_group.model_dump(), "member_count": int(row["member_count"])}
     except Exception as e:
         return {"error": str(e)}
 
+# ส่ง comment ว่างๆ ทุกกี่วินาที กัน proxy/มือถือตัด connection ที่เงียบ
+CHANGE_FEED_HEARTBEAT_SECONDS = 15
+
+# เป็นเจ้าของหรือสมาชิกของ group (ถามจาก DB ตรงๆ ไม่ใช้ cache เพราะ stream เปิดค้างไว้นาน)
+GROUP_ACCESS_SQL = """
+SELECT EXISTS (
+    SELECT 1 FROM "TripGroup" g
+    WHERE g."trip_id" = $1
+      AND (g."owner_id" = $2
+           OR EXISTS (SELECT 1 FROM "GroupMember" m WHERE m."trip_id" = g."trip_id" AND m."customer_id" = $2))
+) AS allowed
+"""
+
+async def can_access_group(db: Prisma, trip_id: int, customer_id: int) -> bool:
+    rows = await db.query_raw(GROUP_ACCESS_SQL, trip_id, customer_id)
+    return bool(rows and rows[0]["allowed"])
+
+def revokes_access(event: dict, customer_id: int) -> bool:
+    """event ที่อาจทำให้หมดสิทธิ์ดู group: group ถูกลบ, ตัวเองถูกลบออกจาก group หรือ event หาย (resync)"""
+    if event.get("type") == "resync":
+        return True
+    if event.get("op") != "DELETE":
+        return False
+    return event.get("table") == "TripGroup" or (
+        event.get("table") == "GroupMember" and event.get("customer_id") == customer_id
+    )
+
+@router.get("/trip_group/{trip_id}/changes")
+async def stream_trip_group_changes(
+    trip_id: int,
+    request: Request,
+    db: Prisma = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Server-Sent Events: แจ้งเมื่อ plan/schedule/budget/expense/สมาชิกของ group เปลี่ยน
+    event: {"table", "op", "trip_id", "plan_id", "id", ...} หรือ {"type": "resync"} (ให้โหลด /trip_group/{trip_id} ใหม่)
+    ถ้าถูกลบออกจาก group ระหว่างเปิด stream จะได้ event "revoked" แล้ว stream จบ
+    """
+    if not change_feed.available:
+        raise HTTPException(status_code=503, detail="Change feed is not available")
+    customer_id = current_user.customer_id
+    if not await can_access_group(db, trip_id, customer_id):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    queue = change_feed.subscribe(trip_id)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=CHANGE_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                # เช็คสิทธิ์ซ้ำก่อนส่ง event ที่อาจทำให้หมดสิทธิ์ (เช่น ถูกลบแต่ยังเป็นเจ้าของ group ก็ยังดูได้)
+                if revokes_access(event, customer_id) and not await can_access_group(db, trip_id, customer_id):
+                    yield f"event: revoked\ndata: {json.dumps({'type': 'revoked', 'trip_id': trip_id})}\n\n"
+                    return
+                yield f"event: {event.get('type', 'change')}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            change_feed.unsubscribe(trip_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.post("/trip_group")
 async def create_trip_group(trip_group: TripGroup, request: Request, db: Prisma = Depends(get_db)):
     print("👉 received payload:", trip_group)
@@ -84,17 +185,19 @@ async def create_trip_group(trip_group: TripGroup, request: Request, db: Prisma
         if not user:
             return JSONResponse(status_code=404, content={"detail": "User not found"})
         
-        unique_code = await generate_unique_code_not_exists(db)
-        
         trip_group["owner_id"] = user.customer_id
-        trip_group["uniqueCode"] = unique_code
-       
-
-        trip_groups = await db.tripgroup.create(
-            data=trip_group
-        )
+        for attempt in range(CODE_RETRIES):
+            trip_group["uniqueCode"] = await next_group_code(db)
+            try:
+                trip_groups = await db.tripgroup.create(
+                    data=trip_group
+                )
+                break
+            except UniqueViolationError:
+                if attempt == CODE_RETRIES - 1:
+                    raise
         
-        print(f"Created trip group with unique code: {unique_code}")
+        print(f"Created trip group with unique code: {trip_group['uniqueCode']}")
         return trip_groups
 
     except Exception as e:
@@ -103,127 +206,156 @@ async def create_trip_group(trip_group: TripGroup, request: Request, db: Prisma
 
     # --- backend/routers/trip.py ---
 
+# สร้าง group จาก plan ใน statement เดียว: lock plan -> เช็ค group เดิม -> สร้าง group (code จาก nextval)
+# + สมาชิกคนแรก -> ผูก plan กลับไปที่ group ใหม่
+# ON CONFLICT DO NOTHING: code ชนกับ group เก่า หรือมีอีก request สร้าง group ของ plan นี้ไปก่อน -> ไม่มีแถวใหม่ ให้ลองใหม่
+CREATE_GROUP_FROM_PLAN_SQL = f"""
+WITH p AS (
+    SELECT "plan_id", "creator_id", "start_plan_date", "end_plan_date"
+    FROM "TripPlan"
+    WHERE "plan_id" = $1
+    FOR UPDATE
+),
+existing AS (
+    SELECT * FROM "TripGroup" WHERE "plan_id" = $1
+),
+new_group AS (
+    INSERT INTO "TripGroup" ("plan_id", "owner_id", "description", "uniqueCode", "start_date", "end_date")
+    SELECT p."plan_id", $2, 'Group created from Trip Plan', {NEXT_CODE_EXPR.format(key='$3')}, p."start_plan_date", p."end_plan_date"
+    FROM p
+    WHERE p."creator_id" = $2 AND NOT EXISTS (SELECT 1 FROM existing)
+    ON CONFLICT DO NOTHING
+    RETURNING *
+),
+owner_member AS (
+    INSERT INTO "GroupMember" ("customer_id", "trip_id")
+    SELECT $2, "trip_id" FROM new_group
+),
+linked AS (
+    UPDATE "TripPlan" t
+    SET "trip_id" = new_group."trip_id", "updatedAt" = CURRENT_TIMESTAMP
+    FROM new_group
+    WHERE t."plan_id" = new_group."plan_id"
+)
+SELECT p."creator_id", g.*
+FROM p
+LEFT JOIN (
+    SELECT *, FALSE AS existed FROM new_group
+    UNION ALL
+    SELECT *, TRUE AS existed FROM existing
+) g ON TRUE
+"""
+
 @router.post("/trip_group/create_from_plan/{plan_id}")
 async def create_group_from_plan(plan_id: int, request: Request, db: Prisma = Depends(get_db), current_user = Depends(get_current_user)):
-   
-    # 2. หา TripPlan ต้นทาง
-    trip_plan = await db.tripplan.find_unique(where={"plan_id": plan_id})
-    if not trip_plan:
-        raise HTTPException(status_code=404, detail="Trip Plan not found")
-    
-    # ตรวจสอบว่าเป็นคนสร้าง Plan หรือไม่
-    if trip_plan.creator_id != current_user.customer_id:
-        raise HTTPException(status_code=403, detail="Only the plan creator can create a group")
-
-    # 3. เช็คว่า Plan นี้มี Group อยู่แล้วหรือยัง
-    if trip_plan.trip_id is not None:
-         # กรณีมีอยู่แล้ว อาจจะคืนค่า Group เดิมกลับไป หรือแจ้ง Error ก็ได้
-         existing_group = await db.tripgroup.find_unique(where={"trip_id": trip_plan.trip_id})
-         return existing_group
-
-    try:
-        # 4. สร้าง Unique Code
-        unique_code = await generate_unique_code_not_exists(db)
-
-        # 5. สร้าง TripGroup + Add Member + Link TripPlan (ใช้ Transaction ผ่านการ Nest create)
-        # หมายเหตุ: Prisma Python รองรับ Nested writes
-        new_trip_group = await db.tripgroup.create(
-            data={
-                "start_date": trip_plan.start_plan_date,
-                "end_date": trip_plan.end_plan_date,
-                "owner_id": current_user.customer_id,
-                "uniqueCode": unique_code,
-                "description": "Group created from Trip Plan",
-                "plan_id": trip_plan.plan_id,
-                # เพิ่ม User เป็น Member คนแรกทันที
-                "members": {
-                    "create": {
-                        "customer_id": current_user.customer_id
-                    }
-                }
-            }
-        )
-
-        # 6. อัปเดต TripPlan ให้ชี้ไปที่ Group ใหม่
-        await db.tripplan.update(
-            where={"plan_id": plan_id},
-            data={"trip_id": new_trip_group.trip_id}
-        )
-        
-        return new_trip_group
-
-    except Exception as e:
-        print(f"Error creating group: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    for _ in range(CODE_RETRIES):
+        try:
+            rows = await db.query_raw(CREATE_GROUP_FROM_PLAN_SQL, plan_id, current_user.customer_id, GROUP_CODE_KEY)
+        except Exception as e:
+            print(f"Error creating group: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        if not rows:
+            raise HTTPException(status_code=404, detail="Trip Plan not found")
+        row = rows[0]
+        creator_id = row.pop("creator_id")
+
+        # ตรวจสอบว่าเป็นคนสร้าง Plan หรือไม่
+        if creator_id != current_user.customer_id:
+            raise HTTPException(status_code=403, detail="Only the plan creator can create a group")
+
+        if row["trip_id"] is None:
+            # INSERT ชน (ON CONFLICT) statement ถัดไปจะเห็น group ที่เพิ่งสร้าง หรือได้ code เลขถัดไป
+            continue
+
+        # มี Group อยู่แล้วคืนค่า Group เดิม ไม่งั้นคืน Group ที่เพิ่งสร้าง
+        if not row.pop("existed"):
+            membership_cache.invalidate_group(row["trip_id"])
+        return row
+
+    raise HTTPException(status_code=500, detail="Cannot generate unique code")
+
+# ข้อมูลกลุ่มจาก code + ชื่อเจ้าของ + จำนวนสมาชิก + เป็นสมาชิกแล้วหรือยัง ใน query เดียว (แบบ GROUP_VALIDATOR_SQL)
+TRIP_BY_CODE_SQL = """
+SELECT g."trip_id",
+       g."description",
+       g."start_date",
+       g."end_date",
+       p."name_group",
+       o."first_name" AS owner_first_name,
+       o."last_name" AS owner_last_name,
+       (SELECT COUNT(*) FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS member_count,
+       EXISTS (SELECT 1 FROM "GroupMember" m WHERE m."trip_id" = g."trip_id" AND m."customer_id" = $2) AS is_member
+FROM "TripGroup" g
+JOIN "Customer" o ON o."customer_id" = g."owner_id"
+LEFT JOIN "TripPlan" p ON p."plan_id" = g."plan_id"
+WHERE g."uniqueCode" = $1
+"""
 
 @router.get("/trip_group/code/{unique_code}")
 async def get_trip_by_code(unique_code: str, db: Prisma = Depends(get_db), current_user = Depends(get_current_user)):
     try:
-        trip = await db.tripgroup.find_unique(
-            where={"uniqueCode": unique_code},
-            include={
-                "owner": True,
-                "members": True,
-                "tripPlan": True  # ✅ เพิ่ม: ดึง TripPlan มาด้วยเพื่อเอาชื่อกลุ่ม
-            }
-        )
-        if not trip:
-            raise HTTPException(status_code=404, detail="ไม่พบกลุ่มนี้")
-        
-        # เช็คสถานะสมาชิก
-        is_member = any(m.customer_id == current_user.customer_id for m in trip.members)
-        
-        # ✅ ดึงชื่อจาก TripPlan ถ้าไม่มีให้ใช้ "No Name"
-        group_name = trip.tripPlan.name_group if trip.tripPlan else "No Name"
-
-        return {
-            "trip_id": trip.trip_id,
-            "name_group": group_name,  # ✅ ส่งชื่อที่ดึงมากลับไปให้ Frontend
-            "description": trip.description,
-            "owner_name": f"{trip.owner.first_name} {trip.owner.last_name}",
-            "member_count": len(trip.members),
-            "start_date": trip.start_date,
-            "end_date": trip.end_date,
-            "is_member": is_member
-        }
+        rows = await db.query_raw(TRIP_BY_CODE_SQL, unique_code, current_user.customer_id)
     except Exception as e:
         print(f"Error getting trip by code: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=404, detail="ไม่พบกลุ่มนี้")
+    trip = rows[0]
+
+    return {
+        "trip_id": trip["trip_id"],
+        # ✅ ดึงชื่อจาก TripPlan ถ้าไม่มีให้ใช้ "No Name"
+        "name_group": trip["name_group"] or "No Name",
+        "description": trip["description"],
+        "owner_name": f"{trip['owner_first_name']} {trip['owner_last_name']}",
+        "member_count": int(trip["member_count"]),
+        "start_date": trip["start_date"],
+        "end_date": trip["end_date"],
+        "is_member": trip["is_member"]
+    }
     
+# หา group จาก code + เพิ่มสมาชิก (ถ้ายังไม่เป็น) + นับสมาชิก ใน statement เดียว
+# ON CONFLICT ใช้ @@unique([customer_id, trip_id]) ของ GroupMember ไม่ต้องโหลดสมาชิกทั้งหมดมาเช็ค
+JOIN_GROUP_SQL = """
+WITH g AS (
+    SELECT "trip_id", "plan_id", "owner_id", "description", "uniqueCode", "start_date", "end_date"
+    FROM "TripGroup"
+    WHERE "uniqueCode" = $1
+),
+ins AS (
+    INSERT INTO "GroupMember" ("customer_id", "trip_id")
+    SELECT $2, g."trip_id" FROM g
+    ON CONFLICT ("customer_id", "trip_id") DO NOTHING
+    RETURNING "trip_id"
+)
+SELECT g.*,
+       (SELECT COUNT(*) FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") + (SELECT COUNT(*) FROM ins) AS member_count,
+       EXISTS (SELECT 1 FROM ins) AS joined
+FROM g
+"""
+
 @router.post("/trip_group/join")
 async def join_group(data: JoinGroupRequest, request: Request, db: Prisma = Depends(get_db), current_user = Depends(get_current_user)):
-    # 1. ตรวจสอบ User
-   
+    try:
+        rows = await db.query_raw(JOIN_GROUP_SQL, data.unique_code, current_user.customer_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    # 2. หา Group จาก Code
-    trip_group = await db.tripgroup.find_unique(
-        where={"uniqueCode": data.unique_code},
-        include={"members": True}
-    )
-    
-    if not trip_group:
+    if not rows:
         raise HTTPException(status_code=404, detail="Invalid Group Code")
 
-    # 3. เช็คว่าอยู่ในกลุ่มแล้วหรือยัง
-    is_member = any(m.customer_id == current_user.customer_id for m in trip_group.members)
-    if is_member:
-        return {"message": "Already a member", "trip_group": trip_group}
+    trip_group = rows[0]
+    joined = trip_group.pop("joined")
+    member_count = int(trip_group.pop("member_count"))
+    if joined:
+        membership_cache.invalidate_group(trip_group["trip_id"])
 
-    # 4. เพิ่ม Member
-    try:
-        await db.groupmember.create(
-            data={
-                "customer_id": current_user.customer_id,
-                "trip_id": trip_group.trip_id
-            }
-        )
-        
-        # return ข้อมูลกลุ่มล่าสุดกลับไป
-        updated_group = await db.tripgroup.find_unique(where={"trip_id": trip_group.trip_id})
-        return updated_group
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "message": "Joined" if joined else "Already a member",
+        "trip_group": trip_group,
+        "member_count": member_count
+    }
 
 @router.put("/trip_group/{trip_id}")
 async def update_trip_group(trip_id: int, trip_group: TripGroup, db: Prisma = Depends(get_db)):
@@ -244,6 +376,7 @@ async def delete_trip_group(trip_id: int, db: Prisma = Depends(get_db)):
         trip_group = await db.tripgroup.delete(
             where={"trip_id": trip_id}
         )
+        membership_cache.invalidate_group(trip_id)
         return trip_group
     
     except Exception as e:
@@ -261,11 +394,16 @@ async def read_group_member(db: Prisma = Depends(get_db)):
 
 @router.post("/group_member")
 async def create_group_member(group_member: GroupMember, db: Prisma = Depends(get_db)):
-    return await db.groupmember.create(data=group_member.model_dump())
+    created = await db.groupmember.create(data=group_member.model_dump())
+    membership_cache.invalidate_group(created.trip_id)
+    return created
 
 @router.delete("/group_member/{group_member_id}")
 async def delete_group_member(group_member_id: int, db: Prisma = Depends(get_db)):
-    return await db.groupmember.delete(where={"group_member_id": group_member_id})
+    deleted = await db.groupmember.delete(where={"group_member_id": group_member_id})
+    if deleted:
+        membership_cache.invalidate_group(deleted.trip_id)
+    return deleted
 
 
 @router.delete("/trip_group/{trip_id}/leave")
@@ -278,6 +416,7 @@ async def leave_trip_group(trip_id: int, db: Prisma = Depends(get_db), current_u
                 "customer_id": current_user.customer_id
             }
         )
+        membership_cache.invalidate_group(trip_id)
         return {"message": "Left the trip group successfully"}
     
     except Exception as e:
@@ -317,6 +456,7 @@ async def remove_member(
         await db.groupmember.delete(
             where={"group_member_id": group_member_id}
         )
+        membership_cache.invalidate_group(trip_id)
         
         return {"message": "Member removed successfully"}
 
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from prisma import Prisma, types
-from prisma.errors import ForeignKeyViolationError, UniqueViolationError, RecordNotFoundError
+from prisma.errors import ForeignKeyViolationError
 from datetime import datetime, date as D, time as T
 import json
-from typing import Any
-from dependencies import get_db, get_current_user
+from typing import Any, Optional
+from dependencies import get_db, get_current_user, encode_cursor, decode_cursor, make_etag, etag_matches
 from schemas import TripPlan, TripSchedule, TripScheduleDocIn, TripScheduleBulkRequest, TripPlanUpdate
+from service.json_patch import PatchError
+from service.schedule_slots import replace_slots, patch_schedule, ScheduleConflict
 
 router = APIRouter(tags=["Plan & Schedule"])
 
@@ -43,8 +45,102 @@ async def read_trip_plan(db: Prisma = Depends(get_db), current_user = Depends(ge
     except Exception as e:
         return {"error": str(e)}
 
+SUMMARY_FIELDS = ("plan_id", "name_group", "start_plan_date", "end_plan_date", "day_of_trip", "image", "creator_id")
+
+# ต้องประกาศก่อน /trip_plan/{plan_id} ไม่งั้น "summary" จะถูกจับเป็น plan_id
+@router.get("/trip_plan/summary")
+async def read_trip_plan_summary(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Prisma = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """รายการทริปสำหรับหน้า list: ไม่มี payload ของ schedule และรายชื่อสมาชิก มีแค่จำนวนสมาชิก"""
+    where = {
+        "OR": [
+            {"creator_id": current_user.customer_id},
+            {"tripGroup": {"members": {"some": {"customer_id": current_user.customer_id}}}}
+        ]
+    }
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # cursor มาจาก client แก้ไขได้ ค่าผิดรูปแบบต้องตอบ 400 ไม่ใช่ 500
+        try:
+            start, plan_id = datetime.fromisoformat(values[0]), int(values[1])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # keyset ต่อจาก (start_plan_date DESC, plan_id DESC)
+        where = {
+            "AND": [where, {
+                "OR": [
+                    {"start_plan_date": {"lt": start}},
+                    {"start_plan_date": start, "plan_id": {"lt": plan_id}}
+                ]
+            }]
+        }
+
+    plans = await db.tripplan.find_many(
+        where=where,
+        include={"tripGroup": True},
+        order=[{"start_plan_date": "desc"}, {"plan_id": "desc"}],
+        take=limit + 1
+    )
+    has_more = len(plans) > limit
+    plans = plans[:limit]
+
+    # นับสมาชิกและเช็คว่ามี schedule หรือยัง ด้วย group_by ครั้งเดียว แทนการดึงทุกแถวมานับ
+    trip_ids = [p.tripGroup.trip_id for p in plans if p.tripGroup]
+    member_counts = {}
+    if trip_ids:
+        rows = await db.groupmember.group_by(by=["trip_id"], where={"trip_id": {"in": trip_ids}}, count=True)
+        member_counts = {row["trip_id"]: row["_count"]["_all"] for row in rows}
+    plan_ids = [p.plan_id for p in plans]
+    scheduled = set()
+    if plan_ids:
+        rows = await db.tripschedule.group_by(by=["plan_id"], where={"plan_id": {"in": plan_ids}}, count=True)
+        scheduled = {row["plan_id"] for row in rows}
+
+    items = []
+    for p in plans:
+        item = {field: getattr(p, field) for field in SUMMARY_FIELDS}
+        item["trip_id"] = p.tripGroup.trip_id if p.tripGroup else None
+        item["unique_code"] = p.tripGroup.uniqueCode if p.tripGroup else None
+        item["member_count"] = member_counts.get(item["trip_id"], 0)
+        item["has_schedule"] = p.plan_id in scheduled
+        items.append(item)
+
+    next_cursor = None
+    if has_more:
+        last = plans[-1]
+        next_cursor = encode_cursor(last.start_plan_date.isoformat(), last.plan_id)
+    return {"items": items, "next_cursor": next_cursor}
+
+# ค่าที่เปลี่ยนเมื่อข้อมูลใน /trip_plan/{plan_id} เปลี่ยน (plan, schedule, group, สมาชิก, budget) query เดียวไม่ต้องโหลด payload
+PLAN_VALIDATOR_SQL = """
+SELECT p."updatedAt" AS plan_updated,
+       s."version" AS schedule_version,
+       g."updatedAt" AS group_updated,
+       b."total_budget",
+       (SELECT COUNT(*) FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS member_count,
+       (SELECT MAX(m."joinAt") FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS last_join,
+       (SELECT SUM(m."group_member_id") FROM "GroupMember" m WHERE m."trip_id" = g."trip_id") AS member_ids
+FROM "TripPlan" p
+LEFT JOIN "TripSchedule" s ON s."plan_id" = p."plan_id"
+LEFT JOIN "TripGroup" g ON g."plan_id" = p."plan_id"
+LEFT JOIN "Budget" b ON b."plan_id" = p."plan_id"
+WHERE p."plan_id" = $1
+"""
+
 @router.get("/trip_plan/{plan_id}")
-async def read_trip_plan_by_id(plan_id: int, db: Prisma = Depends(get_db)):
+async def read_trip_plan_by_id(plan_id: int, request: Request, response: Response, db: Prisma = Depends(get_db)):
+    rows = await db.query_raw(PLAN_VALIDATOR_SQL, plan_id)
+    if rows:
+        etag = make_etag(rows[0])
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
     try:
         trip_plan = await db.tripplan.find_unique(
             where={"plan_id": plan_id},
@@ -130,50 +226,139 @@ def normalize_for_prisma(item: TripSchedule) -> dict:
         "description": item.description or "",
     }   
 
+def parse_if_match(request: Request) -> Optional[int]:
+    """If-Match: "3" -> 3 (ไม่ส่งมาหรือเป็น * = ไม่ต้องเช็ค version)"""
+    value = request.headers.get("if-match")
+    if not value or value.strip() == "*":
+        return None
+    value = value.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a schedule version")
+
 @router.get("/trip_schedule/{plan_id}")
-async def read_by_plan(plan_id: int, db: Prisma = Depends(get_db)):
+async def read_by_plan(plan_id: int, request: Request, response: Response, db: Prisma = Depends(get_db)):
+    # version เพิ่มทุกครั้งที่เขียน payload เช็คก่อนโดยไม่ต้องโหลด payload
+    rows = await db.query_raw('SELECT "version" FROM "TripSchedule" WHERE "plan_id" = $1', plan_id)
+    if rows and etag_matches(request, f'"{rows[0]["version"]}"'):
+        return Response(status_code=304, headers={"ETag": f'"{rows[0]["version"]}"'})
+
     schedule = await db.tripschedule.find_first(
         where={"plan_id": plan_id}
     )
     if not schedule:
         raise HTTPException(status_code=404, detail="Plan not found")
+    # ส่ง version กลับไปเป็น ETag ให้ client ใช้เป็น If-Match ตอน PATCH
+    response.headers["ETag"] = f'"{schedule.version}"'
     return schedule
 
-@router.post("/trip_schedule")
-async def create_trip_schedule_doc(trip_schedule: TripScheduleDocIn, db: Prisma = Depends(get_db)):
+@router.patch("/trip_schedule/{plan_id}")
+async def patch_trip_schedule_doc(plan_id: int, request: Request, response: Response, db: Prisma = Depends(get_db)):
+    """แก้เฉพาะส่วนที่เปลี่ยนของ payload
+    - Content-Type: application/json-patch+json (หรือ body เป็น array) -> RFC 6902 JSON Patch
+    - อย่างอื่น -> RFC 7396 Merge Patch
+    ส่ง If-Match: "<version>" มาด้วย ถ้ามีคนแก้ไปก่อนจะได้ 409 แทนการเขียนทับกัน
+    """
     try:
-        trip_schedule = trip_schedule.model_dump()
-        payload_json = json.dumps(trip_schedule["payload"])
-        doc = await db.tripschedule.create(
-            data={
-                "payload": payload_json,       # required
-                "plan_id" : trip_schedule["plan_id"],  # required
-            }
-        )
-        return doc
-    except UniqueViolationError:
-        # มี plan_id นี้อยู่แล้ว
-        raise HTTPException(status_code=409, detail="plan_id already exists; use PUT /trip_schedule/{plan_id}")
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    json_patch = "json-patch" in request.headers.get("content-type", "") or isinstance(body, list)
+    try:
+        version = await patch_schedule(db, plan_id, body, json_patch, parse_if_match(request))
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ScheduleConflict as e:
+        raise HTTPException(status_code=409, detail={"message": "Schedule was modified", "version": e.version})
+    if version is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+
+    # ไม่ต้องส่ง payload ทั้งก้อนกลับ client มีอยู่แล้ว ใช้ version (ETag) เป็น If-Match ครั้งถัดไป
+    response.headers["ETag"] = f'"{version}"'
+    return {"plan_id": plan_id, "version": version}
+
+async def upsert_trip_schedule(db: Prisma, plan_id: int, payload):
+    """บันทึก payload ของ plan ด้วย upsert ครั้งเดียว (มีแล้วแทนที่ + version+1, ยังไม่มีสร้างใหม่)"""
+    raw = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    try:
+        async with db.tx() as tx:
+            schedule = await tx.tripschedule.upsert(
+                where={"plan_id": plan_id},
+                data={
+                    "create": {"plan_id": plan_id, "payload": raw},
+                    "update": {"payload": raw, "version": {"increment": 1}}
+                }
+            )
+            await replace_slots(tx, plan_id, payload)
+        return schedule
     except ForeignKeyViolationError:
         raise HTTPException(status_code=404, detail="TripPlan not found for given plan_id")
 
+@router.post("/trip_schedule")
+async def create_trip_schedule_doc(trip_schedule: TripScheduleDocIn, db: Prisma = Depends(get_db)):
+    return await upsert_trip_schedule(db, trip_schedule.plan_id, trip_schedule.payload)
+
 @router.put("/trip_schedule/{plan_id}")
 async def replace_trip_schedule_doc(plan_id: int, trip_schedule: TripScheduleDocIn, db: Prisma = Depends(get_db)):
-    trip_schedule = trip_schedule.model_dump()
-    payload = trip_schedule["payload"]   # ✅ ตรงนี้เป็น dict/list อยู่แล้ว
-    if not isinstance(payload, str):
-        payload = json.dumps(payload, ensure_ascii=False)
-    
-    try:
-        return await db.tripschedule.update(
-            where={"plan_id": trip_schedule["plan_id"]},
-            data={"payload": payload}  # Now it's a proper JSON string
-        )
-    except RecordNotFoundError:
-        try:
-            return await db.tripschedule.create(
-                data={"plan_id": plan_id, "payload": payload}
-            )
-        except ForeignKeyViolationError:
-            raise HTTPException(status_code=404, detail="TripPlan not found for given plan_id")
-        
\ No newline at end of file
+    # ใช้ plan_id จาก path (body.plan_id คงไว้เพื่อให้ client เดิมส่งมาได้)
+    return await upsert_trip_schedule(db, plan_id, trip_schedule.payload)
+        
+
+# --- Schedule Slot (ตารางย่อยของ payload ไว้ query ทีละวัน/ค้นหาสถานที่) ---
+SLOT_FIELDS = ("plan_id", "day_index", "position", "date", "time", "activity", "location_name", "lat", "lng")
+
+def slot_dict(slot) -> dict:
+    return {field: getattr(slot, field) for field in SLOT_FIELDS}
+
+@router.get("/trip_schedule/{plan_id}/days/{day_index}")
+async def read_schedule_day(plan_id: int, day_index: int, db: Prisma = Depends(get_db)):
+    """โหลดแค่วันเดียว ไม่ต้องส่ง payload ทั้งทริป"""
+    slots = await db.scheduleslot.find_many(
+        where={"plan_id": plan_id, "day_index": day_index},
+        order={"position": "asc"}
+    )
+    if not slots:
+        raise HTTPException(status_code=404, detail="Day not found")
+    return {
+        "plan_id": plan_id,
+        "day_index": day_index,
+        "date": slots[0].date,
+        "schedule": [slot_dict(slot) for slot in slots]
+    }
+
+@router.get("/schedule_slots/search")
+async def search_schedule_slots(
+    location: Optional[str] = None,
+    date: Optional[D] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Prisma = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ค้นหากิจกรรมตามชื่อสถานที่และ/หรือวันที่ ในทริปที่ผู้ใช้สร้างหรือเป็นสมาชิก"""
+    if not location and not date:
+        raise HTTPException(status_code=400, detail="location or date is required")
+
+    where = {
+        "tripPlan": {
+            "OR": [
+                {"creator_id": current_user.customer_id},
+                {"tripGroup": {"members": {"some": {"customer_id": current_user.customer_id}}}}
+            ]
+        }
+    }
+    if location:
+        # ILIKE '%x%' ใช้ trigram index ScheduleSlot_location_name_idx
+        where["location_name"] = {"contains": location, "mode": "insensitive"}
+    if date:
+        where["date"] = datetime.combine(date, T(0, 0, 0))
+
+    slots = await db.scheduleslot.find_many(
+        where=where,
+        order=[{"date": "asc"}, {"plan_id": "asc"}, {"position": "asc"}],
+        take=limit
+    )
+    return {"items": [slot_dict(slot) for slot in slots]}
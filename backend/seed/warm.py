@@ -2,11 +2,12 @@
 import asyncio
 import sys
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 # Import ของจำเป็น
 from prisma import Prisma
 from service.google_map import fetch_google_place_details
+from service.attraction import CACHE_DURATION_DAYS
 
 async def main():
     print("🔥 Starting Cache Warmup (ดึงข้อมูลรวดเดียว)...")
@@ -50,6 +51,7 @@ async def main():
                         "address": new_address,
                         "photo_ref": new_photo_ref,
                         "last_fetched_at": datetime.now(timezone.utc),
+                        "refresh_after": datetime.now(timezone.utc) + timedelta(days=CACHE_DURATION_DAYS),
                         "description": new_description,
                         "place_types": new_types
                     }
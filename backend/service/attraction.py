@@ -1,12 +1,170 @@
 # app/services/attraction_service.py
 
+import os
+from collections import Counter
 from datetime import datetime, timezone, timedelta
+from typing import Dict
 
 from service.google_map import fetch_google_place_details
+from service.explore import mark_explore_stale
 from db import db
 
 
-CACHE_DURATION_DAYS = 7 
+# TTL ปรับตามความนิยม: ตัวที่คนดูบ่อย (คะแนน/เรตติ้งเปลี่ยนบ่อย) อายุสั้น ตัวที่ไม่ค่อยมีคนดูอายุยาว
+CACHE_DURATION_DAYS = 7
+CACHE_TTL_HOT_DAYS = int(os.getenv("CACHE_TTL_HOT_DAYS", "2"))
+CACHE_TTL_COLD_DAYS = int(os.getenv("CACHE_TTL_COLD_DAYS", "30"))
+
+# popularity = จำนวน hit ที่ลดค่าลงครึ่งหนึ่งทุกๆ POPULARITY_HALF_LIFE_DAYS วัน
+POPULARITY_HALF_LIFE_DAYS = 3
+HOT_POPULARITY = 20.0
+COLD_POPULARITY = 1.0
+
+# hit ที่ยังไม่ได้บันทึกลง DB (flush เป็นชุดเบื้องหลังแทนการเขียน DB ทุก request ดู service/cache_refresher.py)
+access_counts: Counter = Counter()
+last_accessed: Dict[int, datetime] = {}
+
+# มี refresher รันอยู่เบื้องหลังหรือไม่ (ตั้งโดย service/cache_refresher.py)
+# ถ้าไม่มี ตัวที่หมดอายุต้อง refresh ตอน request เอง ไม่งั้นตัว cold จะค้างข้อมูลเก่าไปตลอด
+_background_refresh = False
+
+
+def set_background_refresh(active: bool):
+    global _background_refresh
+    _background_refresh = active
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def decay_popularity(popularity: float, since: datetime, now: datetime) -> float:
+    if not popularity or not since:
+        return popularity or 0.0
+    elapsed = (now - _as_utc(since)).total_seconds()
+    half_life = timedelta(days=POPULARITY_HALF_LIFE_DAYS).total_seconds()
+    return popularity * 0.5 ** (max(elapsed, 0) / half_life)
+
+
+def current_popularity(attraction, now: datetime) -> float:
+    """ความนิยม ณ ตอนนี้ (ค่าใน DB ที่ลดค่าตามเวลา + hit ที่ยังไม่ได้ flush)"""
+    stored = decay_popularity(attraction.popularity, attraction.last_accessed_at, now)
+    return stored + access_counts.get(attraction.attraction_id, 0)
+
+
+def cache_ttl(popularity: float) -> timedelta:
+    if popularity >= HOT_POPULARITY:
+        return timedelta(days=CACHE_TTL_HOT_DAYS)
+    if popularity < COLD_POPULARITY:
+        return timedelta(days=CACHE_TTL_COLD_DAYS)
+    return timedelta(days=CACHE_DURATION_DAYS)
+
+
+def is_expired(attraction, now: datetime) -> bool:
+    if not attraction.last_fetched_at:
+        return True
+
+    age = now - _as_utc(attraction.last_fetched_at)
+    return age >= cache_ttl(current_popularity(attraction, now))
+
+
+def is_cold(attraction, now: datetime) -> bool:
+    return current_popularity(attraction, now) < COLD_POPULARITY
+
+
+def map_google_data(google_data: dict) -> dict:
+    """แปลงข้อมูลจาก Google Places เป็น field ของ CacheAttraction"""
+    summary_obj = google_data.get("editorialSummary", {})
+
+    photos = google_data.get("photos", [])
+    new_photo_ref = None
+    if photos and len(photos) > 0:
+        # API V1 จะส่งมาเป็น resource name เช่น "places/PLACE_ID/photos/PHOTO_UID"
+        new_photo_ref = photos[0]["name"]
+
+    return {
+        "rating": google_data.get("rating"),
+        "review_count": google_data.get("userRatingCount"),
+        "address": google_data.get("formattedAddress"),
+        "photo_ref": new_photo_ref,
+        "description": summary_obj.get("text"),
+        "place_types": google_data.get("types", [])
+    }
+
+
+async def refresh_attraction(attraction, include_city: bool = False):
+    """ดึงข้อมูลใหม่จาก Google แล้วอัปเดตลง Cache (คืนค่า None ถ้า Google ไม่ตอบ)"""
+    google_data = await fetch_google_place_details(attraction.google_place_id)
+    if not google_data:
+        return None
+
+    now = datetime.now(timezone.utc)
+    updated = await db.cacheattraction.update(
+        where={"attraction_id": attraction.attraction_id},
+        data={
+            **map_google_data(google_data),
+            "last_fetched_at": now,
+            "refresh_after": now + cache_ttl(current_popularity(attraction, now))
+        },
+        include={"city": True} if include_city else None # return ข้อมูลเมืองกลับไปด้วย
+    )
+    mark_explore_stale()
+    return updated
+
+
+async def flush_access_stats() -> int:
+    """บันทึก hit ที่ค้างอยู่ลง DB ทีเดียวเป็น batch และคำนวณ refresh_after ใหม่ตามความนิยม"""
+    if not access_counts:
+        return 0
+
+    # ยังไม่ล้างตัวนับจนกว่าจะเขียนสำเร็จ ถ้า DB error hit จะอยู่รอ flush รอบถัดไป
+    pending = dict(access_counts)
+    accessed = dict(last_accessed)
+
+    rows = await db.cacheattraction.find_many(
+        where={"attraction_id": {"in": list(pending)}}
+    )
+    if not rows:
+        # แถวถูกลบไปแล้ว ไม่ต้องเก็บ hit ไว้อีก
+        _forget_flushed(pending, accessed)
+        return 0
+
+    async with db.batch_() as batcher:
+        for attraction in rows:
+            hits = pending[attraction.attraction_id]
+            accessed_at = accessed.get(attraction.attraction_id, datetime.now(timezone.utc))
+            popularity = decay_popularity(attraction.popularity, attraction.last_accessed_at, accessed_at) + hits
+
+            data = {
+                "hit_count": {"increment": hits},
+                "popularity": popularity,
+                "last_accessed_at": accessed_at
+            }
+            if attraction.last_fetched_at:
+                data["refresh_after"] = _as_utc(attraction.last_fetched_at) + cache_ttl(popularity)
+
+            batcher.cacheattraction.update(
+                where={"attraction_id": attraction.attraction_id},
+                data=data
+            )
+
+    _forget_flushed(pending, accessed)
+    return len(rows)
+
+
+def _forget_flushed(pending: Dict[int, int], accessed: Dict[int, datetime]):
+    """หัก hit ที่เขียนลง DB แล้วออก (hit ที่เข้ามาระหว่าง flush ยังอยู่ให้รอบถัดไป)"""
+    for attraction_id, hits in pending.items():
+        remaining = access_counts[attraction_id] - hits
+        if remaining > 0:
+            access_counts[attraction_id] = remaining
+        else:
+            access_counts.pop(attraction_id, None)
+        if last_accessed.get(attraction_id) == accessed.get(attraction_id):
+            last_accessed.pop(attraction_id, None)
+
 
 async def get_attraction_with_cache(attraction_id: int):
     attraction = await db.cacheattraction.find_unique(
@@ -17,52 +175,21 @@ async def get_attraction_with_cache(attraction_id: int):
     if not attraction:
         return None
 
-    is_expired = False
     now = datetime.now(timezone.utc)
-    
-    if attraction.last_fetched_at:
-        last_fetched = attraction.last_fetched_at
-        if last_fetched.tzinfo is None:
-            last_fetched = last_fetched.replace(tzinfo=timezone.utc)
-            
-        age = now - last_fetched
-        if age.days >= CACHE_DURATION_DAYS:
-            is_expired = True
-    else:
-        is_expired = True
-
-    if is_expired:
+    # เช็คก่อนนับ hit ครั้งนี้ ไม่งั้นทุกตัวที่มีคนเปิดจะไม่มีวัน cold
+    expired = is_expired(attraction, now)
+    cold = is_cold(attraction, now)
+    access_counts[attraction_id] += 1
+    last_accessed[attraction_id] = now
+
+    if expired:
+        if attraction.last_fetched_at and cold and _background_refresh:
+            # ตัวที่ไม่ค่อยมีคนดู ส่งข้อมูลเดิมไปก่อน ให้ refresher จัดการเบื้องหลัง
+            return attraction
+
         print(f"🔄 Refreshing cache for attraction ID: {attraction_id} ({attraction.name})")
-        google_data = await fetch_google_place_details(attraction.google_place_id)
-        
-        if google_data:
-        
-            new_rating = google_data.get("rating")
-            new_review_count = google_data.get("userRatingCount")
-            new_address = google_data.get("formattedAddress")
-            summary_obj = google_data.get("editorialSummary", {})
-            new_description = summary_obj.get("text")
-            new_types = google_data.get("types", [])
-        
-            photos = google_data.get("photos", [])
-            new_photo_ref = None
-            if photos and len(photos) > 0:
-                # API V1 จะส่งมาเป็น resource name เช่น "places/PLACE_ID/photos/PHOTO_UID"
-                new_photo_ref = photos[0]["name"] 
-
-            # 4. อัปเดตข้อมูลลง Database (Cache)
-            attraction = await db.cacheattraction.update(
-                where={"attraction_id": attraction_id},
-                data={
-                    "rating": new_rating,
-                    "review_count": new_review_count,
-                    "address": new_address,
-                    "photo_ref": new_photo_ref,
-                    "last_fetched_at": now,
-                    "description": new_description,
-                    "place_types": new_types
-                },
-                include={"city": True} # return ข้อมูลเมืองกลับไปด้วย
-            )
-            
-    return attraction
\ No newline at end of file
+        refreshed = await refresh_attraction(attraction, include_city=True)
+        if refreshed:
+            attraction = refreshed
+
+    return attraction
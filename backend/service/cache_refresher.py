@@ -0,0 +1,138 @@
+import asyncio
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from db import db
+from service.attraction import (
+    POPULARITY_HALF_LIFE_DAYS, current_popularity, flush_access_stats, refresh_attraction, set_background_refresh
+)
+
+# ตั้งค่าผ่าน .env ได้
+REFRESH_ENABLED = os.getenv("CACHE_REFRESH_ENABLED", "1") == "1"
+# refresh ล่วงหน้าก่อนหมดอายุกี่ชั่วโมง
+REFRESH_LEAD_HOURS = int(os.getenv("CACHE_REFRESH_LEAD_HOURS", "24"))
+# ดึงแถวที่ใกล้หมดอายุมาทีละกี่แถวต่อรอบ
+REFRESH_BATCH_SIZE = int(os.getenv("CACHE_REFRESH_BATCH_SIZE", "50"))
+# บันทึกสถิติการเข้าชมลง DB ทุกกี่วินาที
+FLUSH_INTERVAL_SECONDS = int(os.getenv("CACHE_FLUSH_INTERVAL_SECONDS", "60"))
+# ถ้าไม่มีอะไรต้อง refresh ให้พักกี่วินาที (และเป็นระยะห่างสูงสุดระหว่างการเรียก Places)
+IDLE_SLEEP_SECONDS = 300
+MIN_INTERVAL_SECONDS = 1.0
+# Google ไม่ตอบ ให้เลื่อนออกไปพ้นช่วง lead ก่อนค่อยลองใหม่ จะได้ไม่ขวางแถวอื่นใน batch
+RETRY_AFTER_HOURS = 1
+
+# แถวที่ใกล้หมดอายุ เรียงตามความนิยมที่ลดค่าตามเวลาแล้ว (แบบเดียวกับ decay_popularity)
+# popularity ใน DB เป็นค่า ณ last_accessed_at ตัวที่เคยฮิตแต่ไม่มีใครดูนานแล้วต้องไม่ได้คิวก่อน
+DUE_BY_POPULARITY_SQL = """
+SELECT "attraction_id"
+FROM "CacheAttraction"
+WHERE "refresh_after" IS NULL
+   OR "refresh_after" < (now() AT TIME ZONE 'UTC') + make_interval(hours => $1)
+ORDER BY "popularity" * power(0.5, GREATEST(
+    EXTRACT(EPOCH FROM (now() AT TIME ZONE 'UTC') - COALESCE("last_accessed_at", now() AT TIME ZONE 'UTC')), 0
+) / $2) DESC, "attraction_id"
+LIMIT $3
+"""
+
+_refresh_task: Optional[asyncio.Task] = None
+_flush_task: Optional[asyncio.Task] = None
+
+
+def refresh_interval_seconds(due_count: int) -> float:
+    """เกลี่ยการเรียก Places ให้เท่าๆ กันตลอดช่วง lead (แถวที่จะหมดอายุในช่วงนี้ถูก refresh ทันก่อนหมดอายุ)"""
+    lead_seconds = timedelta(hours=REFRESH_LEAD_HOURS).total_seconds()
+    interval = lead_seconds / max(due_count, 1)
+    return min(max(MIN_INTERVAL_SECONDS, interval), IDLE_SLEEP_SECONDS)
+
+
+async def refresh_due_attractions() -> int:
+    """refresh แถวที่ใกล้หมดอายุหนึ่ง batch เรียงตามความนิยม คืนค่าจำนวนแถวที่ refresh"""
+    now = datetime.now(timezone.utc)
+    due_where = {
+        "OR": [
+            {"refresh_after": None},
+            {"refresh_after": {"lt": now + timedelta(hours=REFRESH_LEAD_HOURS)}}
+        ]
+    }
+
+    half_life_seconds = timedelta(days=POPULARITY_HALF_LIFE_DAYS).total_seconds()
+    rows = await db.query_raw(DUE_BY_POPULARITY_SQL, REFRESH_LEAD_HOURS, half_life_seconds, REFRESH_BATCH_SIZE)
+    if not rows:
+        return 0
+    due = await db.cacheattraction.find_many(
+        where={"attraction_id": {"in": [row["attraction_id"] for row in rows]}}
+    )
+
+    # รวม hit ที่ยังไม่ได้ flush ด้วย ตัวที่คนเปิดดูบ่อยได้ refresh ก่อน
+    due.sort(key=lambda a: -current_popularity(a, now))
+
+    due_count = await db.cacheattraction.count(where=due_where)
+    interval = refresh_interval_seconds(due_count)
+
+    refreshed = 0
+    for attraction in due:
+        print(f"🔄 [refresher] {attraction.name} (popularity={current_popularity(attraction, now):.1f})")
+        if await refresh_attraction(attraction):
+            refreshed += 1
+        else:
+            await db.cacheattraction.update(
+                where={"attraction_id": attraction.attraction_id},
+                data={"refresh_after": datetime.now(timezone.utc) + timedelta(hours=REFRESH_LEAD_HOURS + RETRY_AFTER_HOURS)}
+            )
+        await asyncio.sleep(interval)
+
+    return refreshed
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            refreshed = await refresh_due_attractions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ [refresher] Error: {e}")
+            refreshed = 0
+
+        if not refreshed:
+            await asyncio.sleep(IDLE_SLEEP_SECONDS)
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            await flush_access_stats()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ [refresher] Flush error: {e}")
+
+
+def start_cache_refresher():
+    """เริ่มบันทึกสถิติการเข้าชมเป็นระยะเสมอ และ refresh cache เบื้องหลังถ้า CACHE_REFRESH_ENABLED"""
+    global _refresh_task, _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_loop())
+    if REFRESH_ENABLED and _refresh_task is None:
+        print("🔥 Attraction cache refresher started")
+        _refresh_task = asyncio.create_task(_refresh_loop())
+        set_background_refresh(True)
+
+
+async def stop_cache_refresher():
+    global _refresh_task, _flush_task
+    set_background_refresh(False)
+    tasks = [task for task in (_refresh_task, _flush_task) if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _refresh_task = None
+    _flush_task = None
+
+    # บันทึก hit ที่ค้างอยู่ก่อนปิด DB
+    try:
+        await flush_access_stats()
+    except Exception as e:
+        print(f"⚠️ [refresher] Flush error: {e}")
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional, Set
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from dotenv import load_dotenv
+
+from service.membership_cache import membership_cache
+
+try:
+    import asyncpg
+except ImportError:  # ไม่มี asyncpg ก็ยังรันได้ แค่ /trip_group/{trip_id}/changes จะตอบ 503
+    asyncpg = None
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+# ช่องที่ trigger notify_trip_change() ส่งมา (ดู prisma/migrations/*_add_trip_change_notify)
+CHANNEL = "trip_changes"
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "1") == "1"
+RECONNECT_SECONDS = 5
+# event ที่ค้างได้ต่อ subscriber ถ้าเกินให้ client โหลดใหม่ทั้งก้อนแทน (event "resync")
+QUEUE_SIZE = 100
+
+
+def _asyncpg_dsn(url: str) -> str:
+    # URL ของ Prisma มี ?schema=... ที่ asyncpg ไม่รู้จัก เก็บไว้แค่ sslmode
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k == "sslmode"]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class ChangeFeed:
+    """ฟัง LISTEN trip_changes จาก Postgres connection เดียว แล้วกระจาย event ให้ subscriber ของแต่ละ trip"""
+
+    def __init__(self):
+        # {trip_id: {queue, ...}}
+        self.subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if not CHANGE_FEED_ENABLED:
+            return
+        if asyncpg is None or not DATABASE_URL:
+            print("⚠️ Change feed disabled (pip install asyncpg and set DATABASE_URL)")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            # รอให้ _run จบจริงก่อน (ไม่งั้น connect ที่ค้างอยู่อาจเปิด connection ใหม่หลัง _close)
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._close()
+
+    async def _close(self):
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    async def _run(self):
+        while True:
+            try:
+                self._conn = await asyncpg.connect(_asyncpg_dsn(DATABASE_URL))
+                await self._conn.add_listener(CHANNEL, self._on_notify)
+                print("📡 Change feed listening on", CHANNEL)
+                # รอจนกว่า connection หลุด แล้วต่อใหม่ (ระหว่างนั้น event อาจหาย ให้ client resync)
+                while not self._conn.is_closed():
+                    await asyncio.sleep(RECONNECT_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Change feed error: {e}")
+            await self._close()
+            self._broadcast_all({"type": "resync"})
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        trip_id = event.get("trip_id")
+        if trip_id is None:
+            return
+        if event.get("table") in ("GroupMember", "TripGroup"):
+            # สมาชิกเปลี่ยนจาก process อื่น/SQL ตรงๆ ก็ยัง invalidate cache ของ process นี้ได้
+            membership_cache.invalidate_group(trip_id)
+        for queue in self.subscribers.get(trip_id, ()):
+            self._put(queue, event)
+
+    def _put(self, queue: asyncio.Queue, event: dict):
+        if queue.full():
+            # client อ่านไม่ทัน ทิ้ง event เก่าแล้วบอกให้โหลดใหม่
+            while not queue.empty():
+                queue.get_nowait()
+            event = {"type": "resync"}
+        queue.put_nowait(event)
+
+    def _broadcast_all(self, event: dict):
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self._put(queue, event)
+
+    def subscribe(self, trip_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(trip_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, trip_id: int, queue: asyncio.Queue):
+        queues = self.subscribers.get(trip_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[trip_id]
+
+
+change_feed = ChangeFeed()
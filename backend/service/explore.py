@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from db import db
+
+# สร้าง payload หน้า explore ใหม่อย่างน้อยทุกกี่วินาที (นอกเหนือจากตอนที่ cache ถูก refresh)
+EXPLORE_TTL_SECONDS = int(os.getenv("EXPLORE_TTL_SECONDS", "600"))
+EXPLORE_ATTRACTIONS_PER_CITY = 5
+# field ที่หน้า explore แสดงจริง ไม่เอาสถิติ cache (hit_count, popularity, last_fetched_at, refresh_after ฯลฯ)
+# ที่เปลี่ยนทุกครั้งที่ flush/refresh ไม่งั้น ETag เปลี่ยนทั้งที่หน้าจอไม่มีอะไรต่าง และไม่ควรเปิดให้คนนอกเห็น
+CITY_FIELDS = ("city_id", "name", "image_url")
+ATTRACTION_FIELDS = ("attraction_id", "name", "rating", "review_count", "photo_ref", "place_types", "description", "city_id")
+
+_body: Optional[bytes] = None
+_etag: Optional[str] = None
+_built_at = 0.0
+_stale = True
+_lock = asyncio.Lock()
+
+
+def mark_explore_stale():
+    """เรียกเมื่อ CacheAttraction เปลี่ยน ให้ snapshot ถูกสร้างใหม่ใน request ถัดไป"""
+    global _stale
+    _stale = True
+
+
+def _needs_rebuild() -> bool:
+    return _body is None or _stale or time.monotonic() - _built_at >= EXPLORE_TTL_SECONDS
+
+
+async def build_explore_snapshot() -> Tuple[bytes, str]:
+    global _body, _etag, _built_at, _stale
+    # ตั้ง flag ก่อน query เผื่อมีการ refresh ระหว่างสร้าง snapshot จะได้สร้างใหม่อีกรอบ
+    _stale = False
+    cities = await db.city.find_many(
+        include={
+            "attractions": {
+                "take": EXPLORE_ATTRACTIONS_PER_CITY,
+                "order_by": {"rating": "desc"}
+            }
+        }
+    )
+    payload = [
+        {
+            **{field: getattr(city, field) for field in CITY_FIELDS},
+            "attractions": [{field: getattr(a, field) for field in ATTRACTION_FIELDS} for a in city.attractions or []]
+        }
+        for city in cities
+    ]
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode()
+    _body = body
+    _etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    _built_at = time.monotonic()
+    return _body, _etag
+
+
+async def get_explore_snapshot() -> Tuple[bytes, str]:
+    global _stale
+    if _needs_rebuild():
+        async with _lock:
+            # มีคนสร้างให้แล้วระหว่างรอ lock
+            if _needs_rebuild():
+                try:
+                    return await build_explore_snapshot()
+                except Exception:
+                    _stale = True
+                    raise
+    return _body, _etag
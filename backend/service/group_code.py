@@ -0,0 +1,28 @@
+import hashlib
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# key ของการสลับเลข ไม่ให้เดา code ของ group ถัดไปได้จากลำดับ (ส่งเป็น hash ไม่ส่ง secret ตรงๆ เข้า DB)
+_secret = os.getenv("GROUP_CODE_SECRET") or os.getenv("SECRET_KEY")
+if not _secret:
+    # ใช้ค่า default ได้แค่ตอนทดสอบในเครื่อง ใครก็รู้ key นี้ = เดา code ของ group ถัดไปได้
+    print("⚠️" * 10)
+    print("⚠️ GROUP_CODE_SECRET (or SECRET_KEY) is not set: trip group codes use a PUBLIC default key and are guessable.")
+    print("⚠️ Set GROUP_CODE_SECRET in .env before running in production.")
+    print("⚠️" * 10)
+    _secret = "trip-group-code"
+GROUP_CODE_KEY = hashlib.sha256(_secret.encode()).hexdigest()
+
+# sequence + function ใน Postgres (ดู prisma/migrations/*_add_trip_group_code_seq)
+# ใช้ฝังใน INSERT ได้เลย: ... VALUES (..., trip_group_code(nextval('trip_group_code_seq'), $n), ...)
+NEXT_CODE_EXPR = "trip_group_code(nextval('trip_group_code_seq'), {key})"
+NEXT_CODE_SQL = f"SELECT {NEXT_CODE_EXPR.format(key='$1')} AS code"
+
+
+async def next_group_code(db) -> str:
+    """ได้ code ใหม่จาก sequence (ไม่ต้อง query เช็คซ้ำ ชนได้แค่กับ code แบบสุ่มของ group เก่า)"""
+    rows = await db.query_raw(NEXT_CODE_SQL, GROUP_CODE_KEY)
+    return rows[0]["code"]
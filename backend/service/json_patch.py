@@ -0,0 +1,137 @@
+import copy
+import re
+from typing import Any, List
+
+
+class PatchError(ValueError):
+    """patch ใช้กับเอกสารนี้ไม่ได้ (path ไม่มีอยู่, op ผิด, test ไม่ผ่าน)"""
+
+
+def _parse_pointer(pointer: str) -> List[str]:
+    # RFC 6901: "/itinerary/0/schedule/2" -> ["itinerary", "0", "schedule", "2"]
+    if not isinstance(pointer, str):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    # เลขฐานสิบ ASCII ไม่มี 0 นำหน้า (isdigit ยอมรับตัวเลขยูนิโค้ดอย่าง "๑" ด้วย)
+    if not re.fullmatch(r"0|[1-9][0-9]*", token):
+        raise PatchError(f"Invalid array index: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _resolve(doc: Any, parts: List[str]) -> Any:
+    for part in parts:
+        if isinstance(doc, dict):
+            if part not in doc:
+                raise PatchError(f"Path not found: /{'/'.join(parts)}")
+            doc = doc[part]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, part)]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(parts)}")
+    return doc
+
+
+def _add(doc: Any, parts: List[str], value: Any) -> Any:
+    if not parts:
+        return value
+    parent = _resolve(doc, parts[:-1])
+    if isinstance(parent, dict):
+        parent[parts[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, parts[-1], allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add to /{'/'.join(parts)}")
+    return doc
+
+
+def _remove(doc: Any, parts: List[str]) -> Any:
+    if not parts:
+        raise PatchError("Cannot remove the whole document")
+    parent = _resolve(doc, parts[:-1])
+    if isinstance(parent, dict):
+        if parts[-1] not in parent:
+            raise PatchError(f"Path not found: /{'/'.join(parts)}")
+        return parent.pop(parts[-1])
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, parts[-1]))
+    raise PatchError(f"Path not found: /{'/'.join(parts)}")
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """เทียบแบบ JSON (RFC 6902 test): true ไม่เท่ากับ 1, ตัวเลขเทียบค่า, object/array เทียบลึก"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+
+def apply_json_patch(doc: Any, operations: List[dict]) -> Any:
+    """RFC 6902 JSON Patch (add/remove/replace/move/copy/test) ทำทั้งชุดหรือไม่ทำเลย"""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch must be an array of operations")
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get("op"), str) \
+                or not isinstance(operation.get("path"), str):
+            raise PatchError(f"Invalid operation: {operation}")
+        op = operation["op"]
+        parts = _parse_pointer(operation["path"])
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' requires a value")
+
+        if op == "add":
+            doc = _add(doc, parts, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(doc, parts)
+        elif op == "replace":
+            if parts:
+                _resolve(doc, parts)  # ต้องมีอยู่แล้ว
+                _remove(doc, parts)
+            doc = _add(doc, parts, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            if "from" not in operation:
+                raise PatchError(f"'{op}' requires from")
+            source = _parse_pointer(operation["from"])
+            if op == "move":
+                if parts[:len(source)] == source and parts != source:
+                    raise PatchError("Cannot move a value into itself")
+                value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, parts, value)
+        elif op == "test":
+            if not _json_equal(_resolve(doc, parts), operation["value"]):
+                raise PatchError(f"Test failed at {operation['path']}")
+        else:
+            raise PatchError(f"Unknown op: {op}")
+    return doc
+
+
+def apply_merge_patch(doc: Any, patch: Any) -> Any:
+    """RFC 7396 JSON Merge Patch: key ที่เป็น null = ลบ, object = merge ต่อ, อย่างอื่นแทนที่ทั้งก้อน"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
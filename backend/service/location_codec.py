@@ -0,0 +1,43 @@
+import struct
+from typing import Iterable, List, Tuple
+
+# frame แบบ packed สำหรับ client ที่ join ด้วย encoding='packed'
+#   header: version (u8), kind (u8), count (u16)
+#   entry : member index (u16), lat*1e5 (i32), lng*1e5 (i32), updated_at epoch วินาที (u32)
+# ใช้ 14 byte ต่อคน แทน JSON ~150 byte ที่ต้องส่ง sid/username/ISO time ซ้ำทุกครั้ง
+# ชื่อและ sid ส่งแยกครั้งเดียวผ่าน member index (ดู get_location.member_index)
+FRAME_VERSION = 1
+KIND_LOCATIONS = 1
+KIND_SNAPSHOT = 2
+
+HEADER = struct.Struct('<BBH')
+ENTRY = struct.Struct('<HiiI')
+
+# 1e-5 องศา ≈ 1.1 เมตร ละเอียดพอสำหรับแผนที่
+COORD_SCALE = 100000
+
+
+def quantize(value: float) -> int:
+    return int(round(value * COORD_SCALE))
+
+
+def encode_frame(kind: int, entries: Iterable[Tuple[int, float, float, float]]) -> bytes:
+    """entries = [(member_index, lat, lng, updated_ts), ...]"""
+    entries = list(entries)
+    parts = [HEADER.pack(FRAME_VERSION, kind, len(entries))]
+    for index, lat, lng, updated_ts in entries:
+        parts.append(ENTRY.pack(index, quantize(lat), quantize(lng), int(updated_ts)))
+    return b''.join(parts)
+
+
+def decode_frame(data: bytes) -> Tuple[int, List[Tuple[int, float, float, int]]]:
+    version, kind, count = HEADER.unpack_from(data, 0)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    entries = []
+    offset = HEADER.size
+    for _ in range(count):
+        index, lat, lng, updated = ENTRY.unpack_from(data, offset)
+        entries.append((index, lat / COORD_SCALE, lng / COORD_SCALE, updated))
+        offset += ENTRY.size
+    return kind, entries
@@ -0,0 +1,146 @@
+import math
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# จำนวนจุดล่าสุดที่เก็บต่อสมาชิก (เก่ากว่านี้จะถูกเขียนทับ)
+HISTORY_SIZE = int(os.getenv("LOCATION_HISTORY_SIZE", "256"))
+
+# รัศมีโลก (เมตร) ใช้แปลง lat/lng เป็นระยะบนระนาบตอนลดจำนวนจุด
+EARTH_RADIUS_M = 6371000.0
+
+Point = Tuple[float, float, float]
+
+
+class RingBuffer:
+    """เก็บจุด (lat, lng, ts) ล่าสุดแบบวนทับใน array('d') ก้อนเดียว ขนาดคงที่ ไม่สร้าง dict ต่อจุด"""
+
+    __slots__ = ("size", "data", "head", "count")
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        # [lat0, lng0, ts0, lat1, lng1, ts1, ...] = 24 byte ต่อจุด
+        self.data = array('d', bytes(8 * 3 * size))
+        self.head = 0
+        self.count = 0
+
+    def append(self, lat: float, lng: float, ts: float):
+        offset = self.head * 3
+        self.data[offset] = lat
+        self.data[offset + 1] = lng
+        self.data[offset + 2] = ts
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def last_ts(self) -> float:
+        if not self.count:
+            return 0.0
+        return self.data[((self.head - 1) % self.size) * 3 + 2]
+
+    def points(self, since: Optional[float] = None) -> List[Point]:
+        """คืนค่าจุดจากเก่าไปใหม่ (ถ้ามี since เอาเฉพาะจุดที่ ts > since)"""
+        start = (self.head - self.count) % self.size
+        result = []
+        for i in range(self.count):
+            offset = ((start + i) % self.size) * 3
+            ts = self.data[offset + 2]
+            if since is not None and ts <= since:
+                continue
+            result.append((self.data[offset], self.data[offset + 1], ts))
+        return result
+
+
+def _perpendicular_distance_m(point: Point, start: Point, end: Point, cos_lat: float) -> float:
+    # ระยะทางใกล้ๆ กันใช้ระนาบ (equirectangular) ก็แม่นพอ และเร็วกว่า haversine มาก
+    px, py = point[1] * cos_lat, point[0]
+    ax, ay = start[1] * cos_lat, start[0]
+    bx, by = end[1] * cos_lat, end[0]
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        distance = math.hypot(px - ax, py - ay)
+    else:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+        distance = math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+    return math.radians(distance) * EARTH_RADIUS_M
+
+
+def douglas_peucker(points: List[Point], tolerance_m: float) -> List[Point]:
+    """ลดจำนวนจุดของเส้นทาง โดยจุดที่เหลือเบี่ยงจากเส้นเดิมไม่เกิน tolerance_m เมตร"""
+    if tolerance_m <= 0 or len(points) < 3:
+        return list(points)
+
+    cos_lat = math.cos(math.radians(sum(p[0] for p in points) / len(points)))
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    # ใช้ stack แทน recursion กันเส้นยาวๆ ชน recursion limit
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance, index = 0.0, None
+        for i in range(first + 1, last):
+            distance = _perpendicular_distance_m(points[i], points[first], points[last], cos_lat)
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if index is not None and max_distance > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+class LocationHistory:
+    """ประวัติ location ล่าสุดของสมาชิกแต่ละคน แยกตาม group (เก็บใน process นี้เท่านั้น)"""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        # {group_id: {socket_id: RingBuffer}}
+        self.buffers: Dict[str, Dict[str, RingBuffer]] = {}
+        # {socket_id: username}
+        self.usernames: Dict[str, str] = {}
+
+    def record(self, group_id: str, sid: str, username: str, lat: float, lng: float, ts: float):
+        buffer = self.buffers.setdefault(group_id, {}).get(sid)
+        if buffer is None:
+            buffer = self.buffers[group_id][sid] = RingBuffer(self.size)
+        buffer.append(lat, lng, ts)
+        self.usernames[sid] = username
+
+    def drop(self, group_id: str, sid: str):
+        buffers = self.buffers.get(group_id)
+        if buffers is not None:
+            buffers.pop(sid, None)
+            if not buffers:
+                del self.buffers[group_id]
+        self.usernames.pop(sid, None)
+
+    def evict_stale(self, cutoff: float) -> int:
+        """ลบเส้นทางของคนที่ไม่มีจุดใหม่ตั้งแต่ก่อน cutoff"""
+        evicted = 0
+        for group_id in list(self.buffers):
+            for sid in [sid for sid, buffer in self.buffers[group_id].items() if buffer.last_ts() < cutoff]:
+                self.drop(group_id, sid)
+                evicted += 1
+        return evicted
+
+    def trajectories(self, group_id: str, since: Optional[float] = None, tolerance_m: float = 0) -> List[dict]:
+        result = []
+        for sid, buffer in self.buffers.get(group_id, {}).items():
+            points = douglas_peucker(buffer.points(since), tolerance_m)
+            if not points:
+                continue
+            result.append({
+                "sid": sid,
+                "username": self.usernames.get(sid),
+                # [[lat, lng, ts], ...] เรียงจากเก่าไปใหม่
+                "points": [[lat, lng, ts] for lat, lng, ts in points]
+            })
+        return result
+
+    def memory_stats(self) -> dict:
+        members = sum(len(buffers) for buffers in self.buffers.values())
+        return {
+            "history_members": members,
+            "history_points": sum(b.count for buffers in self.buffers.values() for b in buffers.values()),
+            "history_bytes": members * self.size * 3 * 8
+        }
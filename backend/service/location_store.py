@@ -0,0 +1,374 @@
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# memory = เก็บใน process เดียว (ค่าเริ่มต้น), redis = ใช้ร่วมกันหลาย process/เครื่อง
+LOCATION_STORE = os.getenv("LOCATION_STORE", "memory")
+LOCATION_REDIS_URL = os.getenv("LOCATION_REDIS_URL", "redis://localhost:6379/0")
+# member index ใน frame แบบ packed เป็น u16 (ดู service/location_codec.py)
+MAX_MEMBER_INDEX = 65535
+
+
+class InMemoryLocationStore:
+    """เก็บสมาชิกและ location ล่าสุดไว้ใน dict ของ process นี้"""
+
+    def __init__(self):
+        # {socket_id: {"group_id": ..., "username": ...}}
+        self.members: Dict[str, dict] = {}
+        # {group_id: {socket_id, ...}}
+        self.group_members: Dict[str, set] = {}
+        # {group_id: {socket_id: location_data}}
+        self.group_locations: Dict[str, Dict[str, dict]] = {}
+        # {socket_id: heartbeat ล่าสุด (epoch วินาที)} worker ที่ถือ socket อยู่ต่ออายุให้เรื่อยๆ ดู touch_members
+        self.heartbeats: Dict[str, float] = {}
+        # {group_id: {socket_id ที่ขอ encoding แบบ packed, ...}} ไม่มีใครขอก็ไม่ต้อง encode frame แบบ packed
+        self.packed_members: Dict[str, set] = {}
+
+    async def add_member(self, sid: str, group_id: str, username: str, encoding: str = "json", max_members: int = 0) -> Optional[int]:
+        """เพิ่มสมาชิก คืนค่า member index (เลขประจำตัวเล็กๆ ใน group ใช้แทน sid ใน frame แบบ packed)
+        ถ้า group มีครบ max_members แล้ว (และ sid ยังไม่อยู่ใน group นี้) คืนค่า None
+        """
+        current = self.members.get(sid)
+        sids = self.group_members.get(group_id, set())
+        if current and current["group_id"] == group_id:
+            index = current["index"]
+        else:
+            if max_members and len(sids) >= max_members:
+                return None
+            used = {self.members[other]["index"] for other in sids}
+            index = next(i for i in itertools.count() if i not in used)
+            if index > MAX_MEMBER_INDEX:
+                return None
+        self.members[sid] = {"group_id": group_id, "username": username, "encoding": encoding, "index": index}
+        self.group_members.setdefault(group_id, sids).add(sid)
+        self.heartbeats[sid] = time.time()
+        if encoding == "packed":
+            self.packed_members.setdefault(group_id, set()).add(sid)
+        else:
+            self._discard_packed(group_id, sid)
+        return index
+
+    def _discard_packed(self, group_id: str, sid: str):
+        packed = self.packed_members.get(group_id)
+        if packed is not None:
+            packed.discard(sid)
+            if not packed:
+                del self.packed_members[group_id]
+
+    async def get_member(self, sid: str) -> Optional[dict]:
+        return self.members.get(sid)
+
+    async def remove_member(self, sid: str) -> Optional[dict]:
+        self.heartbeats.pop(sid, None)
+        member = self.members.pop(sid, None)
+        if not member:
+            return None
+        group_id = member["group_id"]
+
+        sids = self.group_members.get(group_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.group_members[group_id]
+        self._discard_packed(group_id, sid)
+
+        locations = self.group_locations.get(group_id)
+        if locations is not None:
+            locations.pop(sid, None)
+            if not locations:
+                del self.group_locations[group_id]
+        return member
+
+    async def group_member_count(self, group_id: str) -> int:
+        return len(self.group_members.get(group_id, ()))
+
+    async def packed_member_count(self, group_id: str) -> int:
+        """จำนวนคนใน group ที่ขอ encoding แบบ packed"""
+        return len(self.packed_members.get(group_id, ()))
+
+    async def group_index(self, group_id: str) -> Dict[str, dict]:
+        """{sid: {"index": ..., "username": ...}} ของทุกคนใน group"""
+        return {
+            sid: {"index": self.members[sid]["index"], "username": self.members[sid]["username"]}
+            for sid in self.group_members.get(group_id, ())
+        }
+
+    async def get_location(self, group_id: str, sid: str) -> Optional[dict]:
+        return self.group_locations.get(group_id, {}).get(sid)
+
+    async def set_location(self, group_id: str, sid: str, data: dict):
+        self.group_locations.setdefault(group_id, {})[sid] = data
+
+    async def get_group_locations(self, group_id: str) -> Dict[str, dict]:
+        return dict(self.group_locations.get(group_id, {}))
+
+    async def evict_stale(self, cutoff: float) -> List[Tuple[str, str]]:
+        """ลบ location ที่ไม่ได้อัปเดตตั้งแต่ก่อน cutoff (epoch วินาที) คืนค่า [(group_id, sid), ...]"""
+        evicted = []
+        for group_id in list(self.group_locations):
+            locations = self.group_locations[group_id]
+            for sid in [sid for sid, data in locations.items() if data.get("updated_ts", 0) < cutoff]:
+                del locations[sid]
+                evicted.append((group_id, sid))
+            if not locations:
+                del self.group_locations[group_id]
+        return evicted
+
+    async def touch_members(self, sids, now: float):
+        """ต่ออายุ heartbeat ของ socket ที่ยังต่ออยู่กับ worker นี้"""
+        for sid in sids:
+            if sid in self.heartbeats:
+                self.heartbeats[sid] = now
+
+    async def evict_dead_members(self, cutoff: float) -> List[Tuple[str, dict]]:
+        """ลบสมาชิกที่ heartbeat เก่ากว่า cutoff (worker ที่ถือ socket ตายไปโดยไม่ได้ disconnect) คืนค่า [(sid, member), ...]"""
+        evicted = []
+        for sid in [sid for sid, seen in self.heartbeats.items() if seen < cutoff]:
+            member = await self.remove_member(sid)
+            if member:
+                evicted.append((sid, member))
+        return evicted
+
+    async def stats(self) -> dict:
+        return {
+            "total_users": len(self.members),
+            "groups": {group_id: len(locations) for group_id, locations in self.group_locations.items()},
+            "users_list": [m["username"] for m in self.members.values()]
+        }
+
+    async def memory_stats(self) -> dict:
+        location_count = sum(len(locations) for locations in self.group_locations.values())
+        # ประมาณขนาดแบบหยาบๆ (ตัว dict + dict ของแต่ละ location)
+        approx_bytes = sys.getsizeof(self.members) + sys.getsizeof(self.group_members) + sys.getsizeof(self.group_locations)
+        approx_bytes += sum(sys.getsizeof(m) for m in self.members.values())
+        approx_bytes += sum(sys.getsizeof(sids) for sids in self.group_members.values())
+        for locations in self.group_locations.values():
+            approx_bytes += sys.getsizeof(locations) + sum(sys.getsizeof(data) for data in locations.values())
+        return {
+            "backend": "memory",
+            "members": len(self.members),
+            "heartbeats": len(self.heartbeats),
+            "groups": len(self.group_members),
+            "locations": location_count,
+            "approx_bytes": approx_bytes
+        }
+
+    async def close(self):
+        pass
+
+
+# KEYS: members, group members, groups, group meta, heartbeats, group packed members, group free indexes
+# ARGV: sid, group_id, {"username", "encoding"}, max_members (0 = ไม่จำกัด), now
+# คืนค่า index หรือ -1 ถ้า group เต็ม
+ADD_MEMBER_LUA = """
+local index
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current then
+    current = cjson.decode(current)
+    if current['group_id'] == ARGV[2] then
+        index = current['index']
+    end
+end
+if not index then
+    local max_members = tonumber(ARGV[4])
+    if max_members > 0 and redis.call('SCARD', KEYS[2]) >= max_members then
+        return -1
+    end
+    -- ใช้ index ที่ว่างจากคนที่ออกไปก่อน (เลขน้อยสุด) ไม่มีค่อยออกเลขใหม่จากตัวนับต่อ group (รีเซ็ตเมื่อ group ว่าง)
+    local free = redis.call('ZPOPMIN', KEYS[7])
+    if free[1] then
+        index = tonumber(free[1])
+    else
+        index = redis.call('HINCRBY', KEYS[4], 'next_index', 1) - 1
+        if index > tonumber(ARGV[6]) then
+            redis.call('HINCRBY', KEYS[4], 'next_index', -1)
+            return -1
+        end
+    end
+end
+local member = cjson.decode(ARGV[3])
+member['group_id'] = ARGV[2]
+member['index'] = index
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(member))
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+redis.call('ZADD', KEYS[5], ARGV[5], ARGV[1])
+if member['encoding'] == 'packed' then
+    redis.call('SADD', KEYS[6], ARGV[1])
+else
+    redis.call('SREM', KEYS[6], ARGV[1])
+end
+return index
+"""
+
+# KEYS: members, heartbeats, groups
+# ARGV: sid, prefix ของ key ของ group ("<prefix>:group:")
+# ลบทุกอย่างของ sid ใน script เดียว (คืน index เข้า free list) และล้าง key ของ group ถ้าไม่เหลือใคร
+REMOVE_MEMBER_LUA = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return false
+end
+local member = cjson.decode(raw)
+local group = ARGV[2] .. member['group_id'] .. ':'
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('SREM', group .. 'members', ARGV[1])
+redis.call('SREM', group .. 'packed', ARGV[1])
+redis.call('HDEL', group .. 'locations', ARGV[1])
+if redis.call('SCARD', group .. 'members') == 0 then
+    redis.call('SREM', KEYS[3], member['group_id'])
+    redis.call('DEL', group .. 'meta', group .. 'free', group .. 'packed', group .. 'locations')
+else
+    redis.call('ZADD', group .. 'free', member['index'], member['index'])
+end
+return raw
+"""
+
+
+class RedisLocationStore:
+    """เก็บข้อมูลเดียวกันใน Redis (หรือ server ที่ใช้ protocol เดียวกัน) เพื่อให้หลาย worker เห็นข้อมูลชุดเดียวกัน"""
+
+    def __init__(self, client, prefix: str = "loc"):
+        self.redis = client
+        self.prefix = prefix
+        self._add_member_script = client.register_script(ADD_MEMBER_LUA)
+        self._remove_member_script = client.register_script(REMOVE_MEMBER_LUA)
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix, *parts))
+
+    async def add_member(self, sid: str, group_id: str, username: str, encoding: str = "json", max_members: int = 0) -> Optional[int]:
+        # เช็คจำนวน + ออก index + บันทึก ใน script เดียว (atomic) กันหลาย worker รับคนเข้า group เกิน max_members พร้อมกัน
+        index = await self._add_member_script(
+            keys=[
+                self._key("members"),
+                self._key("group", group_id, "members"),
+                self._key("groups"),
+                self._key("group", group_id, "meta"),
+                self._key("heartbeats"),
+                self._key("group", group_id, "packed"),
+                self._key("group", group_id, "free")
+            ],
+            args=[sid, group_id, json.dumps({"username": username, "encoding": encoding}), max_members, time.time(), MAX_MEMBER_INDEX]
+        )
+        return None if index < 0 else index
+
+    async def get_member(self, sid: str) -> Optional[dict]:
+        raw = await self.redis.hget(self._key("members"), sid)
+        return json.loads(raw) if raw else None
+
+    async def remove_member(self, sid: str) -> Optional[dict]:
+        # อ่าน + ลบใน script เดียว กัน join/leave ของ sid เดียวกันจากหลาย worker สลับลำดับกันแล้วค้างครึ่งๆ
+        raw = await self._remove_member_script(
+            keys=[self._key("members"), self._key("heartbeats"), self._key("groups")],
+            args=[sid, self._key("group", "")]
+        )
+        return json.loads(raw) if raw else None
+
+    async def group_member_count(self, group_id: str) -> int:
+        return await self.redis.scard(self._key("group", group_id, "members"))
+
+    async def packed_member_count(self, group_id: str) -> int:
+        return await self.redis.scard(self._key("group", group_id, "packed"))
+
+    async def group_index(self, group_id: str) -> Dict[str, dict]:
+        sids = [_decode(sid) for sid in await self.redis.smembers(self._key("group", group_id, "members"))]
+        if not sids:
+            return {}
+        result = {}
+        for sid, raw in zip(sids, await self.redis.hmget(self._key("members"), sids)):
+            if raw:
+                member = json.loads(raw)
+                result[sid] = {"index": member["index"], "username": member["username"]}
+        return result
+
+    async def get_location(self, group_id: str, sid: str) -> Optional[dict]:
+        raw = await self.redis.hget(self._key("group", group_id, "locations"), sid)
+        return json.loads(raw) if raw else None
+
+    async def set_location(self, group_id: str, sid: str, data: dict):
+        await self.redis.hset(self._key("group", group_id, "locations"), sid, json.dumps(data))
+
+    async def get_group_locations(self, group_id: str) -> Dict[str, dict]:
+        raw = await self.redis.hgetall(self._key("group", group_id, "locations"))
+        return {_decode(sid): json.loads(data) for sid, data in raw.items()}
+
+    async def evict_stale(self, cutoff: float) -> List[Tuple[str, str]]:
+        evicted = []
+        for group_id in [_decode(g) for g in await self.redis.smembers(self._key("groups"))]:
+            key = self._key("group", group_id, "locations")
+            raw = await self.redis.hgetall(key)
+            stale = [_decode(sid) for sid, data in raw.items() if json.loads(data).get("updated_ts", 0) < cutoff]
+            if stale:
+                await self.redis.hdel(key, *stale)
+                evicted.extend((group_id, sid) for sid in stale)
+        return evicted
+
+    async def touch_members(self, sids, now: float):
+        sids = list(sids)
+        if sids:
+            # XX = ต่ออายุเฉพาะที่ยังมีอยู่ ไม่สร้าง heartbeat ให้คนที่ถูกลบไปแล้ว
+            await self.redis.zadd(self._key("heartbeats"), {sid: now for sid in sids}, xx=True)
+
+    async def evict_dead_members(self, cutoff: float) -> List[Tuple[str, dict]]:
+        # member ของ worker ที่ crash ไม่มีใครต่ออายุ heartbeat และไม่มี disconnect มาลบให้
+        dead = [_decode(sid) for sid in await self.redis.zrangebyscore(self._key("heartbeats"), "-inf", f"({cutoff}")]
+        evicted = []
+        for sid in dead:
+            member = await self.remove_member(sid)
+            if member:
+                evicted.append((sid, member))
+        return evicted
+
+    async def stats(self) -> dict:
+        members = await self.redis.hgetall(self._key("members"))
+        group_ids = [_decode(g) for g in await self.redis.smembers(self._key("groups"))]
+        groups = {}
+        for group_id in group_ids:
+            groups[group_id] = await self.redis.hlen(self._key("group", group_id, "locations"))
+        return {
+            "total_users": len(members),
+            "groups": groups,
+            "users_list": [json.loads(m)["username"] for m in members.values()]
+        }
+
+    async def memory_stats(self) -> dict:
+        group_ids = [_decode(g) for g in await self.redis.smembers(self._key("groups"))]
+        location_count = 0
+        for group_id in group_ids:
+            location_count += await self.redis.hlen(self._key("group", group_id, "locations"))
+        info = await self.redis.info("memory")
+        return {
+            "backend": "redis",
+            "members": await self.redis.hlen(self._key("members")),
+            "heartbeats": await self.redis.zcard(self._key("heartbeats")),
+            "groups": len(group_ids),
+            "locations": location_count,
+            "redis_used_memory": info.get("used_memory")
+        }
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_location_store():
+    if LOCATION_STORE == "redis":
+        import redis.asyncio as aioredis
+        return RedisLocationStore(aioredis.from_url(LOCATION_REDIS_URL))
+    return InMemoryLocationStore()
+
+
+def create_client_manager():
+    """ให้ Socket.IO ส่ง event ข้าม process ผ่าน Redis pub/sub (ใช้ตอนรันหลาย worker)"""
+    if LOCATION_STORE == "redis":
+        import socketio
+        return socketio.AsyncRedisManager(LOCATION_REDIS_URL)
+    return None
@@ -0,0 +1,135 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from jose import jwt, JWTError
+
+from db import db
+from dependencies import SECRET_KEY, ALGORITHM
+
+# token ที่ตรวจแล้วจำไว้กี่วินาที (logout/login ใหม่จะมีผลช้าสุดเท่านี้ ถ้าไม่ได้ invalidate ใน process เดียวกัน)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+# สมาชิกของแต่ละ group จำไว้กี่วินาที (มีการ invalidate ทุกครั้งที่เพิ่ม/ลบสมาชิกผ่าน API อยู่แล้ว)
+MEMBERSHIP_CACHE_TTL = float(os.getenv("MEMBERSHIP_CACHE_TTL", "300"))
+# uniqueCode -> trip_id จำไว้กี่วินาที และกี่ code (LRU) group ที่ถูกลบแล้วจะหลุดออกเองตามเวลา
+CODE_CACHE_TTL = float(os.getenv("CODE_CACHE_TTL", "3600"))
+CODE_CACHE_MAX_SIZE = int(os.getenv("CODE_CACHE_MAX_SIZE", "10000"))
+
+
+class MembershipCache:
+    """cache ผล "token นี้คือใคร" และ "ใครอยู่ใน TripGroup ไหน" เพื่อไม่ต้องถาม DB ทุกครั้งที่ join"""
+
+    def __init__(self):
+        # {token: (customer, expires_at)}
+        self._tokens: Dict[str, Tuple[dict, float]] = {}
+        # {trip_id: (group, expires_at)} group = {"owner_id", "unique_code", "members": set(customer_id)}
+        self._groups: Dict[int, Tuple[dict, float]] = {}
+        # {uniqueCode: (trip_id, expires_at)} เรียงตามการใช้ล่าสุด (LRU) ไม่เกิน CODE_CACHE_MAX_SIZE
+        self._codes: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    # --- token ---
+    async def resolve_token(self, token: str) -> Optional[dict]:
+        """ตรวจ JWT แบบเดียวกับ jwt_middleware คืนค่า {"customer_id", "email", "name"} หรือ None"""
+        if not token:
+            return None
+        cached = self._tokens.get(token)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        email = payload.get("sub")
+        if not email:
+            return None
+
+        user = await db.customer.find_unique(where={"email": email})
+        if not user or user.currentToken != token:
+            self._tokens.pop(token, None)
+            return None
+
+        customer = {
+            "customer_id": user.customer_id,
+            "email": user.email,
+            "name": f"{user.first_name} {user.last_name}".strip()
+        }
+        self._tokens[token] = (customer, time.monotonic() + TOKEN_CACHE_TTL)
+        return customer
+
+    def invalidate_email(self, email: str):
+        for token in [t for t, (customer, _) in self._tokens.items() if customer["email"] == email]:
+            del self._tokens[token]
+
+    # --- group membership ---
+    def _remember(self, group) -> dict:
+        entry = {
+            "owner_id": group.owner_id,
+            "unique_code": group.uniqueCode,
+            "members": {m.customer_id for m in (group.members or [])}
+        }
+        self._groups[group.trip_id] = (entry, time.monotonic() + MEMBERSHIP_CACHE_TTL)
+        self._remember_code(group.uniqueCode, group.trip_id)
+        return entry
+
+    def _remember_code(self, code: str, trip_id: int):
+        self._codes[code] = (trip_id, time.monotonic() + CODE_CACHE_TTL)
+        self._codes.move_to_end(code)
+        while len(self._codes) > CODE_CACHE_MAX_SIZE:
+            self._codes.popitem(last=False)
+
+    async def resolve_trip_id(self, group_ref: str) -> Optional[int]:
+        """รับได้ทั้ง uniqueCode และ trip_id (แอปส่ง uniqueCode มาเป็น group_id)
+        หา uniqueCode ก่อนเสมอ เพราะ code อาจเป็นตัวเลขล้วนได้ (ทั้งแบบสุ่มเดิมและ base32) ไม่ใช่ trip_id ทุกครั้งที่เป็นตัวเลข
+        """
+        cached = self._codes.get(group_ref)
+        if cached and cached[1] > time.monotonic():
+            self._codes.move_to_end(group_ref)
+            return cached[0]
+        self._codes.pop(group_ref, None)
+
+        group = await db.tripgroup.find_unique(where={"uniqueCode": group_ref}, include={"members": True})
+        if group:
+            self._remember(group)
+            return group.trip_id
+        if group_ref.isdigit():
+            return int(group_ref)
+        return None
+
+    async def get_group(self, trip_id: int) -> Optional[dict]:
+        cached = self._groups.get(trip_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        group = await db.tripgroup.find_unique(where={"trip_id": trip_id}, include={"members": True})
+        if not group:
+            self._groups.pop(trip_id, None)
+            return None
+        return self._remember(group)
+
+    async def is_member(self, trip_id: int, customer_id: int) -> bool:
+        group = await self.get_group(trip_id)
+        if not group:
+            return False
+        return customer_id == group["owner_id"] or customer_id in group["members"]
+
+    def invalidate_group(self, trip_id: int):
+        cached = self._groups.pop(trip_id, None)
+        if cached:
+            self._codes.pop(cached[0]["unique_code"], None)
+
+    async def warm(self):
+        """โหลดสมาชิกของทริปที่ยังไม่จบไว้ก่อน ตอนเปิด server"""
+        since = datetime.now(timezone.utc) - timedelta(days=1)
+        groups = await db.tripgroup.find_many(
+            where={"end_date": {"gte": since}},
+            include={"members": True}
+        )
+        for group in groups:
+            self._remember(group)
+        print(f"🔐 Membership cache warmed with {len(groups)} group(s)")
+
+
+membership_cache = MembershipCache()
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import io
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image
+except ImportError:  # ไม่มี Pillow ก็ยังใช้ได้ แค่เก็บรูปตามขนาดที่ Google ย่อมาให้
+    Image = None
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+PHOTO_CACHE_DIR = os.getenv("PHOTO_CACHE_DIR", "cache/photos")
+
+# ขนาด thumbnail ที่อนุญาต (px ด้านที่ยาวที่สุด) จำกัดไว้ไม่ให้ยิงขนาดแปลกๆ จนเปลือง quota
+PHOTO_SIZES = (200, 400, 800)
+DEFAULT_PHOTO_SIZE = 400
+JPEG_QUALITY = 80
+
+# กันไม่ให้รูปเดียวกันถูกดึงจาก Google ซ้อนกันหลาย request
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def photo_version(photo_ref: str) -> str:
+    """ใช้ต่อท้าย URL เพื่อให้ client cache ได้ยาวๆ และได้ URL ใหม่เมื่อ photo_ref เปลี่ยน"""
+    return hashlib.sha1(photo_ref.encode()).hexdigest()[:12]
+
+
+def photo_path(attraction, size: int = DEFAULT_PHOTO_SIZE) -> Optional[str]:
+    if not attraction.photo_ref:
+        return None
+    return f"/attractions/{attraction.attraction_id}/photo?size={size}&v={photo_version(attraction.photo_ref)}"
+
+
+def _ref_file(photo_ref: str, size: int) -> str:
+    key = hashlib.sha1(f"{photo_ref}|{size}".encode()).hexdigest()
+    return os.path.join(PHOTO_CACHE_DIR, "refs", key)
+
+
+def _blob_file(digest: str) -> str:
+    return os.path.join(PHOTO_CACHE_DIR, f"{digest}.jpg")
+
+
+def _lookup(photo_ref: str, size: int) -> Optional[Tuple[str, str]]:
+    ref_file = _ref_file(photo_ref, size)
+    if not os.path.exists(ref_file):
+        return None
+    with open(ref_file, "r") as f:
+        digest = f.read().strip()
+    blob = _blob_file(digest)
+    if not os.path.exists(blob):
+        return None
+    return blob, digest
+
+
+def _make_thumbnail(data: bytes, size: int) -> bytes:
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+def _store(photo_ref: str, size: int, data: bytes) -> Tuple[str, str]:
+    # ตั้งชื่อไฟล์ด้วย hash ของเนื้อรูป รูปเดียวกันจาก ref ต่างกันก็เก็บไฟล์เดียว
+    digest = hashlib.sha256(data).hexdigest()
+    blob = _blob_file(digest)
+    os.makedirs(os.path.dirname(_ref_file(photo_ref, size)), exist_ok=True)
+
+    if not os.path.exists(blob):
+        tmp = f"{blob}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, blob)
+
+    ref_file = _ref_file(photo_ref, size)
+    tmp = f"{ref_file}.tmp"
+    with open(tmp, "w") as f:
+        f.write(digest)
+    os.replace(tmp, ref_file)
+    return blob, digest
+
+
+async def _fetch_from_google(photo_ref: str, size: int) -> Optional[bytes]:
+    if not GOOGLE_API_KEY:
+        print("❌ Error: GOOGLE_API_KEY not found in .env")
+        return None
+
+    url = f"https://places.googleapis.com/v1/{photo_ref}/media"
+    params = {"maxHeightPx": size, "maxWidthPx": size, "key": GOOGLE_API_KEY}
+
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        try:
+            response = await client.get(url, params=params)
+            if response.status_code == 200:
+                return response.content
+            print(f"⚠️ Google Photo Error: {response.status_code} - {response.text[:200]}")
+            return None
+        except Exception as e:
+            print(f"⚠️ Connection Error: {e}")
+            return None
+
+
+async def get_photo(photo_ref: str, size: int = DEFAULT_PHOTO_SIZE) -> Optional[Tuple[str, str]]:
+    """คืนค่า (path ของไฟล์, content hash) ดึงจาก Google แค่ครั้งแรกของแต่ละ photo_ref/size"""
+    cached = _lookup(photo_ref, size)
+    if cached:
+        return cached
+
+    key = f"{photo_ref}|{size}"
+    lock = _locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            cached = _lookup(photo_ref, size)
+            if cached:
+                return cached
+
+            data = await _fetch_from_google(photo_ref, size)
+            if not data:
+                return None
+            try:
+                data = await asyncio.to_thread(_make_thumbnail, data, size)
+            except Exception as e:
+                print(f"⚠️ Thumbnail Error: {e}")
+            return await asyncio.to_thread(_store, photo_ref, size, data)
+    finally:
+        if not lock.locked():
+            _locks.pop(key, None)
@@ -0,0 +1,211 @@
+import os
+import time
+from itertools import islice
+from datetime import date
+from typing import Dict, List, Set, Tuple
+
+from service.geo import haversine_m
+
+# ห่างกันไม่เกินนี้ (เมตร) ถือว่าอยู่ใกล้กัน -> member_nearby
+NEARBY_METERS = float(os.getenv("LOCATION_NEARBY_METERS", "100"))
+# เข้าใกล้จุดในแผนเที่ยววันนี้ไม่เกินนี้ (เมตร) -> geofence_alert
+GEOFENCE_METERS = float(os.getenv("LOCATION_GEOFENCE_METERS", "150"))
+# ต้องห่างออกไปเกิน radius * ค่านี้ถึงจะนับว่าออกแล้ว กัน event เด้งไปมาเพราะ GPS แกว่ง
+EXIT_FACTOR = 1.2
+# เทียบระยะกับคนรอบๆ ได้ไม่เกินกี่คนต่อการอัปเดต (group ใหญ่ที่ยืนรวมกันจุดเดียวจะได้ไม่เป็น O(N) ทุกครั้ง)
+MAX_CANDIDATES = int(os.getenv("LOCATION_NEARBY_MAX_CANDIDATES", "50"))
+# โหลดจุดในแผนเที่ยวใหม่ทุกกี่วินาที (เผื่อแก้แผนระหว่างวัน)
+STOPS_TTL_SECONDS = float(os.getenv("LOCATION_STOPS_TTL_SECONDS", "600"))
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lng: float, precision: int) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision: int) -> Tuple[float, float]:
+    """ขนาด cell ของ geohash (องศา lat, องศา lng)"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def precision_for(radius_m: float) -> int:
+    """precision ละเอียดที่สุดที่ cell ยังใหญ่กว่า radius เพื่อให้หาคนใกล้ได้จาก cell ตัวเอง + 8 cell รอบๆ"""
+    precision = 1
+    for p in range(1, 10):
+        lat_deg, lng_deg = cell_size_deg(p)
+        # ด้าน lng ใช้ที่ละติจูด 60° (cell แคบลงตามละติจูด) เผื่อไว้สำหรับเกือบทุกที่ที่คนไปเที่ยว
+        if min(lat_deg * 111_320, lng_deg * 111_320 * 0.5) < radius_m:
+            break
+        precision = p
+    return precision
+
+
+def neighbor_cells(lat: float, lng: float, precision: int) -> Set[str]:
+    lat_deg, lng_deg = cell_size_deg(precision)
+    cells = set()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            y = max(-90.0, min(90.0, lat + dy * lat_deg))
+            x = (lng + dx * lng_deg + 180.0) % 360.0 - 180.0
+            cells.add(geohash(y, x, precision))
+    return cells
+
+
+class ProximityIndex:
+    """จับคู่สมาชิกที่อยู่ใกล้กันในแต่ละ group แบบ incremental (เทียบเฉพาะคนใน cell รอบๆ ไม่ต้องเทียบทุกคู่)"""
+
+    def __init__(self, radius_m: float = NEARBY_METERS, max_candidates: int = MAX_CANDIDATES):
+        self.radius_m = radius_m
+        self.max_candidates = max_candidates
+        self.precision = precision_for(radius_m * EXIT_FACTOR)
+        # {group_id: {geohash: {socket_id, ...}}}
+        self.buckets: Dict[str, Dict[str, Set[str]]] = {}
+        # {socket_id: (group_id, lat, lng, geohash)}
+        self.positions: Dict[str, Tuple[str, float, float, str]] = {}
+        # {socket_id: {socket_id ที่อยู่ใกล้ตอนนี้, ...}} เก็บทั้งสองฝั่ง
+        self.nearby: Dict[str, Set[str]] = {}
+
+    def _unbucket(self, sid: str):
+        position = self.positions.pop(sid, None)
+        if not position:
+            return
+        group_id, _, _, cell = position
+        cells = self.buckets.get(group_id, {})
+        sids = cells.get(cell)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del cells[cell]
+        if not cells:
+            self.buckets.pop(group_id, None)
+
+    def update(self, group_id: str, sid: str, lat: float, lng: float) -> Tuple[List[Tuple[str, float]], List[str]]:
+        """คืนค่า ([(sid ที่เพิ่งเข้ามาใกล้, ระยะเมตร)], [sid ที่เพิ่งออกห่าง])"""
+        previous = self.positions.get(sid)
+        if previous and previous[0] != group_id:
+            self.remove(sid)
+            previous = None
+
+        cell = geohash(lat, lng, self.precision)
+        if not previous or previous[3] != cell:
+            self._unbucket(sid)
+            self.buckets.setdefault(group_id, {}).setdefault(cell, set()).add(sid)
+        self.positions[sid] = (group_id, lat, lng, cell)
+
+        # ดู cell ตัวเองก่อน แล้วค่อย cell รอบๆ หยิบแค่ max_candidates คน (islice ไม่ต้องไล่ทั้ง cell)
+        cells = self.buckets[group_id]
+        candidates = set()
+        for neighbor in [cell, *(neighbor_cells(lat, lng, self.precision) - {cell})]:
+            room = self.max_candidates - len(candidates)
+            if room <= 0:
+                break
+            candidates.update(islice(cells.get(neighbor, ()), room + 1))
+        candidates.discard(sid)
+
+        current = self.nearby.setdefault(sid, set())
+        entered, left = [], []
+        for other in candidates | current:
+            other_position = self.positions.get(other)
+            if other_position is None:
+                continue
+            distance = haversine_m(lat, lng, other_position[1], other_position[2])
+            if (other not in current and distance <= self.radius_m and len(current) < self.max_candidates
+                    and len(self.nearby.get(other, ())) < self.max_candidates):
+                current.add(other)
+                self.nearby.setdefault(other, set()).add(sid)
+                entered.append((other, distance))
+            elif other in current and distance > self.radius_m * EXIT_FACTOR:
+                current.discard(other)
+                self.nearby.get(other, set()).discard(sid)
+                left.append(other)
+        return entered, left
+
+    def remove(self, sid: str) -> List[str]:
+        """เอาออกจาก index คืนค่า sid ที่เคยอยู่ใกล้ (ต้องแจ้งว่าออกไปแล้ว)"""
+        self._unbucket(sid)
+        former = self.nearby.pop(sid, set())
+        for other in former:
+            self.nearby.get(other, set()).discard(sid)
+        return list(former)
+
+
+def stop_from_slot(slot) -> dict:
+    """ScheduleSlot (ที่มี lat/lng) -> จุด geofence"""
+    return {
+        "id": f"{slot.plan_id}#{slot.day_index}#{slot.position}",
+        "name": slot.location_name or slot.activity,
+        "activity": slot.activity,
+        "time": slot.time,
+        "lat": slot.lat,
+        "lng": slot.lng
+    }
+
+
+class GeofenceTracker:
+    """แจ้งเมื่อสมาชิกเข้า/ออกบริเวณจุดในแผนเที่ยววันนี้ของ group (จุดถูกแบ่งลง geohash bucket ไว้ก่อน)"""
+
+    def __init__(self, radius_m: float = GEOFENCE_METERS):
+        self.radius_m = radius_m
+        self.precision = precision_for(radius_m * EXIT_FACTOR)
+        # {group_id: (loaded_at, day, {geohash: [stop, ...]})}
+        self.stops: Dict[str, Tuple[float, date, Dict[str, List[dict]]]] = {}
+        # {socket_id: {stop_id: stop}}
+        self.inside: Dict[str, Dict[str, dict]] = {}
+
+    def needs_load(self, group_id: str) -> bool:
+        cached = self.stops.get(group_id)
+        return not cached or cached[1] != date.today() or time.monotonic() - cached[0] > STOPS_TTL_SECONDS
+
+    def set_stops(self, group_id: str, stops: List[dict]):
+        cells: Dict[str, List[dict]] = {}
+        for stop in stops:
+            cells.setdefault(geohash(stop["lat"], stop["lng"], self.precision), []).append(stop)
+        self.stops[group_id] = (time.monotonic(), date.today(), cells)
+
+    def update(self, group_id: str, sid: str, lat: float, lng: float) -> Tuple[List[dict], List[dict]]:
+        """คืนค่า ([จุดที่เพิ่งเข้า], [จุดที่เพิ่งออก])"""
+        cached = self.stops.get(group_id)
+        inside = self.inside.setdefault(sid, {})
+        if not cached:
+            return [], []
+        cells = cached[2]
+
+        entered = []
+        for neighbor in neighbor_cells(lat, lng, self.precision):
+            for stop in cells.get(neighbor, ()):
+                if stop["id"] not in inside and haversine_m(lat, lng, stop["lat"], stop["lng"]) <= self.radius_m:
+                    inside[stop["id"]] = stop
+                    entered.append(stop)
+
+        exited = []
+        for stop_id, stop in list(inside.items()):
+            if haversine_m(lat, lng, stop["lat"], stop["lng"]) > self.radius_m * EXIT_FACTOR:
+                del inside[stop_id]
+                exited.append(stop)
+        return entered, exited
+
+    def remove(self, sid: str):
+        self.inside.pop(sid, None)
+
+    def drop_group(self, group_id: str):
+        self.stops.pop(group_id, None)
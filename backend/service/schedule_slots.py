@@ -0,0 +1,106 @@
+import json
+from datetime import date, datetime, time
+from typing import Any, List, Optional
+
+from service.json_patch import apply_json_patch, apply_merge_patch
+
+# ScheduleSlot = แถวย่อยของ TripSchedule.payload (1 แถวต่อ 1 กิจกรรม) เอาไว้ query/index
+# payload ยังเป็นต้นฉบับ ตารางนี้สร้างใหม่จาก payload ทุกครั้งที่บันทึก schedule
+
+
+def _parse_date(value) -> Optional[datetime]:
+    try:
+        return datetime.combine(date.fromisoformat(str(value)[:10]), time.min)
+    except (TypeError, ValueError):
+        return None
+
+
+def _number(value) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def slots_from_payload(plan_id: int, payload) -> List[dict]:
+    """แตก {"itinerary": [{"date", "schedule": [...]}]} เป็น data สำหรับ create_many"""
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return []
+    if not isinstance(payload, dict):
+        return []
+
+    slots = []
+    for day_index, day in enumerate(payload.get("itinerary") or []):
+        if not isinstance(day, dict):
+            continue
+        day_date = _parse_date(day.get("date"))
+        for position, item in enumerate(day.get("schedule") or []):
+            if not isinstance(item, dict):
+                continue
+            location_name = item.get("specific_location_name")
+            slots.append({
+                "plan_id": plan_id,
+                "day_index": day_index,
+                "position": position,
+                "date": day_date,
+                "time": str(item["time"])[:10] if item.get("time") else None,
+                "activity": str(item.get("activity") or ""),
+                "location_name": str(location_name)[:255] if location_name else None,
+                "lat": _number(item.get("lat")),
+                "lng": _number(item.get("lng"))
+            })
+    return slots
+
+
+async def replace_slots(tx, plan_id: int, payload) -> int:
+    """ลบ slot เดิมของ plan แล้วสร้างใหม่จาก payload (เรียกใน transaction เดียวกับที่เขียน payload)"""
+    await tx.scheduleslot.delete_many(where={"plan_id": plan_id})
+    slots = slots_from_payload(plan_id, payload)
+    if not slots:
+        return 0
+    return await tx.scheduleslot.create_many(data=slots)
+
+
+class ScheduleConflict(Exception):
+    """version ของ schedule ไม่ตรงกับที่ client อ่านมา (มีคนแก้ไปก่อน)"""
+
+    def __init__(self, version: Optional[int]):
+        super().__init__("Schedule was modified")
+        self.version = version
+
+
+def load_payload(payload):
+    # แถวเก่าบางแถวเก็บ payload เป็น JSON string ซ้อนอีกชั้น
+    if isinstance(payload, str):
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return payload
+    return payload
+
+
+async def patch_schedule(db, plan_id: int, patch: Any, json_patch: bool, expected_version: Optional[int]) -> Optional[int]:
+    """ใช้ JSON Patch / Merge Patch กับ payload แล้วเขียนกลับเฉพาะเมื่อ version ยังเป็นค่าที่อ่านมา
+    คืน version ใหม่ (None = ไม่มี schedule) โยน PatchError ถ้า patch ใช้ไม่ได้ และ ScheduleConflict ถ้ามีคนแก้ไปก่อน
+    """
+    schedule = await db.tripschedule.find_unique(where={"plan_id": plan_id})
+    if not schedule:
+        return None
+    if expected_version is not None and expected_version != schedule.version:
+        raise ScheduleConflict(schedule.version)
+
+    payload = load_payload(schedule.payload)
+    payload = apply_json_patch(payload, patch) if json_patch else apply_merge_patch(payload, patch)
+
+    # optimistic concurrency: update_many ที่ where version เดิม พร้อมสร้าง ScheduleSlot ใหม่ใน transaction เดียวกัน
+    async with db.tx() as tx:
+        updated = await tx.tripschedule.update_many(
+            where={"plan_id": plan_id, "version": schedule.version},
+            data={"payload": json.dumps(payload, ensure_ascii=False), "version": {"increment": 1}}
+        )
+        if updated:
+            await replace_slots(tx, plan_id, payload)
+    if updated == 0:
+        current = await db.tripschedule.find_unique(where={"plan_id": plan_id})
+        raise ScheduleConflict(current.version if current else None)
+    return schedule.version + 1
@@ -0,0 +1,151 @@
+# ทดสอบ JSON Patch (RFC 6902) / Merge Patch (RFC 7396) และ patch_schedule ที่ PATCH /trip_schedule/{plan_id} ใช้
+#   cd backend && python -m pytest tests/test_json_patch.py
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from service.json_patch import PatchError, apply_json_patch, apply_merge_patch
+from service.schedule_slots import ScheduleConflict, patch_schedule
+
+
+DOC = {"itinerary": [{"date": "2026-10-19", "schedule": [{"activity": "Temple"}, {"activity": "Lunch"}]}]}
+
+
+def test_add_remove_replace():
+    doc = apply_json_patch(DOC, [
+        {"op": "add", "path": "/itinerary/0/schedule/1", "value": {"activity": "Market"}},
+        {"op": "remove", "path": "/itinerary/0/schedule/0"},
+        {"op": "replace", "path": "/itinerary/0/date", "value": "2026-10-20"},
+    ])
+    assert doc == {"itinerary": [{"date": "2026-10-20", "schedule": [{"activity": "Market"}, {"activity": "Lunch"}]}]}
+    # ต้นฉบับไม่ถูกแก้
+    assert DOC["itinerary"][0]["schedule"][0] == {"activity": "Temple"}
+
+
+def test_add_with_end_index():
+    doc = apply_json_patch(DOC, [{"op": "add", "path": "/itinerary/0/schedule/-", "value": {"activity": "Dinner"}}])
+    assert [item["activity"] for item in doc["itinerary"][0]["schedule"]] == ["Temple", "Lunch", "Dinner"]
+    # "-" ใช้ได้เฉพาะตอน add
+    with pytest.raises(PatchError):
+        apply_json_patch(DOC, [{"op": "remove", "path": "/itinerary/0/schedule/-"}])
+
+
+def test_move_and_copy():
+    doc = apply_json_patch(DOC, [
+        {"op": "move", "from": "/itinerary/0/schedule/0", "path": "/itinerary/0/schedule/1"},
+        {"op": "copy", "from": "/itinerary/0/date", "path": "/start"},
+    ])
+    assert [item["activity"] for item in doc["itinerary"][0]["schedule"]] == ["Lunch", "Temple"]
+    assert doc["start"] == "2026-10-19"
+    with pytest.raises(PatchError):
+        apply_json_patch(DOC, [{"op": "move", "from": "/itinerary", "path": "/itinerary/0"}])
+
+
+def test_test_op_is_type_strict():
+    doc = {"count": 1, "flag": True, "nested": {"values": [1, 2.0]}}
+    assert apply_json_patch(doc, [{"op": "test", "path": "/count", "value": 1.0}]) == doc
+    assert apply_json_patch(doc, [{"op": "test", "path": "/nested", "value": {"values": [1.0, 2]}}]) == doc
+    for path, value in (("/count", True), ("/flag", 1), ("/nested", {"values": [True, 2]}), ("/count", "1")):
+        with pytest.raises(PatchError):
+            apply_json_patch(doc, [{"op": "test", "path": path, "value": value}])
+
+
+def test_escaped_pointer_tokens():
+    doc = {"a/b": 1, "m~n": 2}
+    assert apply_json_patch(doc, [{"op": "replace", "path": "/a~1b", "value": 3}])["a/b"] == 3
+    assert apply_json_patch(doc, [{"op": "remove", "path": "/m~0n"}]) == {"a/b": 1}
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "add", "path": 0, "value": 1},
+    {"op": 1, "path": "/a"},
+    {"op": "add", "path": "a", "value": 1},
+    {"op": "copy", "from": ["a"], "path": "/b"},
+    {"op": "remove", "path": "/list/01"},
+    {"op": "remove", "path": "/list/١"},
+    {"op": "add", "path": "/a"},
+    {"op": "bogus", "path": "/a"},
+])
+def test_invalid_operations(operation):
+    with pytest.raises(PatchError):
+        apply_json_patch({"a": 1, "list": [1, 2]}, [operation])
+
+
+def test_merge_patch():
+    doc = {"name": "Trip", "meta": {"budget": 100, "note": "x"}, "tags": ["a"]}
+    patched = apply_merge_patch(doc, {"meta": {"note": None, "currency": "THB"}, "tags": ["b"], "name": None})
+    assert patched == {"meta": {"budget": 100, "currency": "THB"}, "tags": ["b"]}
+
+
+class FakeScheduleTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def find_unique(self, where):
+        row = self.rows.get(where["plan_id"])
+        return SimpleNamespace(**row) if row else None
+
+    async def update_many(self, where, data):
+        row = self.rows.get(where["plan_id"])
+        if not row or row["version"] != where["version"]:
+            return 0
+        row["payload"] = data["payload"]
+        row["version"] += data["version"]["increment"]
+        return 1
+
+
+class FakeSlotTable:
+    async def delete_many(self, where):
+        return 0
+
+    async def create_many(self, data):
+        return len(data)
+
+
+class FakeDb:
+    def __init__(self, rows):
+        self.tripschedule = FakeScheduleTable(rows)
+        self.scheduleslot = FakeSlotTable()
+
+    @asynccontextmanager
+    async def tx(self):
+        yield self
+
+
+def test_patch_schedule_bumps_version():
+    rows = {1: {"version": 3, "payload": json.dumps(DOC)}}
+    ops = [{"op": "replace", "path": "/itinerary/0/schedule/0/activity", "value": "Museum"}]
+    assert asyncio.run(patch_schedule(FakeDb(rows), 1, ops, True, 3)) == 4
+    assert json.loads(rows[1]["payload"])["itinerary"][0]["schedule"][0]["activity"] == "Museum"
+    assert asyncio.run(patch_schedule(FakeDb(rows), 2, ops, True, None)) is None
+
+
+def test_patch_schedule_conflicts_on_stale_version():
+    rows = {1: {"version": 5, "payload": json.dumps(DOC)}}
+    with pytest.raises(ScheduleConflict) as conflict:
+        asyncio.run(patch_schedule(FakeDb(rows), 1, {"name": "x"}, False, 4))
+    assert conflict.value.version == 5
+    assert rows[1]["version"] == 5
+
+
+def test_patch_schedule_conflicts_when_written_concurrently():
+    rows = {1: {"version": 5, "payload": json.dumps(DOC)}}
+    db = FakeDb(rows)
+    update_many = db.tripschedule.update_many
+
+    async def racing_update(where, data):
+        # มีคนเขียนไปก่อนระหว่างอ่านกับเขียน
+        rows[1]["version"] = 6
+        return await update_many(where, data)
+
+    db.tripschedule.update_many = racing_update
+    with pytest.raises(ScheduleConflict) as conflict:
+        asyncio.run(patch_schedule(db, 1, {"name": "x"}, False, None))
+    assert conflict.value.version == 6
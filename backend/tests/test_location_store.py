@@ -0,0 +1,205 @@
+# ทดสอบ contract เดียวกันกับทุก store: InMemoryLocationStore และ RedisLocationStore บน fakeredis
+# (หรือ Redis จริงในเครื่องถ้าตั้ง LOCATION_TEST_REDIS_URL เช่น redis://localhost:6379/15)
+#   cd backend && python -m pytest tests/test_location_store.py
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from service.location_store import InMemoryLocationStore, RedisLocationStore
+
+
+def memory_store():
+    return InMemoryLocationStore()
+
+
+def fakeredis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis ต้องใช้ lupa ถึงจะรัน Lua script ได้
+    return RedisLocationStore(fakeredis.FakeAsyncRedis(), prefix=f"test-{uuid.uuid4().hex[:8]}")
+
+
+def local_redis_store():
+    url = os.getenv("LOCATION_TEST_REDIS_URL")
+    if not url:
+        pytest.skip("LOCATION_TEST_REDIS_URL not set")
+    import redis.asyncio as aioredis
+    return RedisLocationStore(aioredis.from_url(url), prefix=f"test-{uuid.uuid4().hex[:8]}")
+
+
+@pytest.fixture(params=[memory_store, fakeredis_store, local_redis_store], ids=["memory", "fakeredis", "redis"])
+def make_store(request):
+    return request.param
+
+
+def run(make_store, scenario):
+    async def main():
+        store = make_store()
+        try:
+            await scenario(store)
+        finally:
+            await store.close()
+    asyncio.run(main())
+
+
+def test_add_and_remove_member(make_store):
+    async def scenario(store):
+        first = await store.add_member("a", "g1", "Alice")
+        second = await store.add_member("b", "g1", "Bob", "packed")
+        assert first != second
+        assert await store.group_member_count("g1") == 2
+        assert await store.get_member("b") == {"group_id": "g1", "username": "Bob", "encoding": "packed", "index": second}
+        # join ซ้ำ group เดิมได้ index เดิม
+        assert await store.add_member("a", "g1", "Alice") == first
+        assert set(await store.group_index("g1")) == {"a", "b"}
+
+        removed = await store.remove_member("a")
+        assert removed["username"] == "Alice"
+        assert await store.get_member("a") is None
+        assert await store.remove_member("a") is None
+        assert await store.group_member_count("g1") == 1
+
+    run(make_store, scenario)
+
+
+def test_add_member_respects_max_members(make_store):
+    async def scenario(store):
+        assert await store.add_member("a", "g1", "Alice", max_members=2) is not None
+        assert await store.add_member("b", "g1", "Bob", max_members=2) is not None
+        assert await store.add_member("c", "g1", "Carol", max_members=2) is None
+        assert await store.get_member("c") is None
+        # คนที่อยู่แล้ว join ซ้ำได้แม้ group เต็ม
+        assert await store.add_member("a", "g1", "Alice", max_members=2) is not None
+        assert await store.group_member_count("g1") == 2
+
+    run(make_store, scenario)
+
+
+def test_concurrent_joins_do_not_exceed_max_members(make_store):
+    async def scenario(store):
+        results = await asyncio.gather(*(store.add_member(f"s{i}", "g1", f"User {i}", max_members=5) for i in range(20)))
+        assert sum(index is not None for index in results) == 5
+        assert await store.group_member_count("g1") == 5
+        indexes = [index for index in results if index is not None]
+        assert len(set(indexes)) == 5
+
+    run(make_store, scenario)
+
+
+def test_locations_and_evict_stale(make_store):
+    async def scenario(store):
+        await store.add_member("a", "g1", "Alice")
+        await store.add_member("b", "g1", "Bob")
+        await store.set_location("g1", "a", {"lat": 1.0, "lng": 2.0, "updated_ts": 100})
+        await store.set_location("g1", "b", {"lat": 3.0, "lng": 4.0, "updated_ts": 200})
+        assert (await store.get_location("g1", "a"))["lat"] == 1.0
+        assert set(await store.get_group_locations("g1")) == {"a", "b"}
+
+        assert await store.evict_stale(150) == [("g1", "a")]
+        assert await store.get_location("g1", "a") is None
+        assert set(await store.get_group_locations("g1")) == {"b"}
+
+        stats = await store.stats()
+        assert stats["total_users"] == 2
+
+    run(make_store, scenario)
+
+
+def test_evict_dead_members(make_store):
+    async def scenario(store):
+        now = time.time()
+        await store.add_member("a", "g1", "Alice")
+        await store.add_member("b", "g1", "Bob")
+        await store.set_location("g1", "b", {"lat": 3.0, "lng": 4.0, "updated_ts": now})
+        # worker ที่ถือ "a" ยังอยู่ ต่ออายุให้ ส่วน "b" ไม่มีใครต่ออายุ (worker crash)
+        await store.touch_members(["a"], now + 100)
+
+        evicted = await store.evict_dead_members(now + 50)
+        assert [(sid, member["username"]) for sid, member in evicted] == [("b", "Bob")]
+        assert await store.get_member("b") is None
+        assert await store.get_group_locations("g1") == {}
+        assert await store.group_member_count("g1") == 1
+        assert await store.evict_dead_members(now + 50) == []
+
+        # touch ไม่สร้าง heartbeat ให้คนที่ถูกลบไปแล้ว
+        await store.touch_members(["b"], now + 100)
+        evicted = await store.evict_dead_members(now + 200)
+        assert [sid for sid, _ in evicted] == ["a"]
+
+    run(make_store, scenario)
+
+
+def test_packed_member_count(make_store):
+    async def scenario(store):
+        await store.add_member("a", "g1", "Alice")
+        assert await store.packed_member_count("g1") == 0
+        await store.add_member("b", "g1", "Bob", "packed")
+        await store.add_member("c", "g1", "Carol", "packed")
+        assert await store.packed_member_count("g1") == 2
+        # join ซ้ำแล้วเปลี่ยนกลับเป็น json
+        await store.add_member("c", "g1", "Carol", "json")
+        assert await store.packed_member_count("g1") == 1
+        await store.remove_member("b")
+        assert await store.packed_member_count("g1") == 0
+
+    run(make_store, scenario)
+
+
+def test_freed_indexes_are_reused(make_store):
+    async def scenario(store):
+        indexes = {}
+        for sid in "abcd":
+            indexes[sid] = await store.add_member(sid, "g1", sid.upper())
+        await store.remove_member("b")
+        await store.remove_member("c")
+        # คนใหม่ได้ index ที่ว่าง (น้อยสุดก่อน) ไม่ออกเลขใหม่ไปเรื่อยๆ
+        assert await store.add_member("e", "g1", "E") == indexes["b"]
+        assert await store.add_member("f", "g1", "F") == indexes["c"]
+        index = await store.group_index("g1")
+        assert len({member["index"] for member in index.values()}) == 4
+
+        # เข้าออกวนหลายรอบ index ต้องไม่ชนกันและไม่โตเกินจำนวนคน
+        for i in range(100):
+            await store.remove_member("f")
+            assert await store.add_member("f", "g1", "F") < 4
+
+    run(make_store, scenario)
+
+
+def test_remove_last_member_cleans_up_group(make_store):
+    async def scenario(store):
+        await store.add_member("a", "g1", "Alice", "packed")
+        await store.add_member("b", "g1", "Bob")
+        await store.set_location("g1", "a", {"lat": 1.0, "lng": 2.0, "updated_ts": time.time()})
+        await store.remove_member("a")
+        await store.remove_member("b")
+
+        assert await store.group_member_count("g1") == 0
+        assert await store.packed_member_count("g1") == 0
+        assert await store.get_group_locations("g1") == {}
+        assert (await store.stats())["groups"] == {}
+        assert await store.evict_dead_members(time.time() + 1000) == []
+        # group ที่ว่างแล้วเริ่มนับ index ใหม่
+        assert await store.add_member("c", "g1", "Carol") == 0
+
+    run(make_store, scenario)
+
+
+def test_concurrent_leave_and_join(make_store):
+    async def scenario(store):
+        for i in range(10):
+            await store.add_member(f"s{i}", "g1", f"User {i}")
+        await asyncio.gather(
+            *(store.remove_member(f"s{i}") for i in range(0, 10, 2)),
+            *(store.add_member(f"n{i}", "g1", f"New {i}") for i in range(5))
+        )
+        index = await store.group_index("g1")
+        assert len(index) == 10
+        assert len({member["index"] for member in index.values()}) == 10
+
+    run(make_store, scenario)
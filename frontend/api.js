@@ -21,8 +21,8 @@ const getWebSocketUrl = () => {
      return 'http://localhost:3000'; 
   }
 
-  console.log(`Using backend URL: http://${localhost}:8010`);
-  return `http://${localhost}:8010`;
+  console.log(`Using backend URL: http://${localhost}:8000`);
+  return `http://${localhost}:8000`;
 }
 
 export const API_URL = getBackendUrl();
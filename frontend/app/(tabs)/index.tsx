@@ -10,7 +10,7 @@ import { useFocusEffect } from '@react-navigation/native';
 import { API_URL } from '@/api.js'
 import { useRouter } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
-import { ScrollView, TouchableOpacity } from 'react-native-gesture-handler';
+import { FlatList, TouchableOpacity } from 'react-native-gesture-handler';
 
 interface AttractionData {
   attraction_id: number;
@@ -22,10 +22,26 @@ interface AttractionData {
   description: string;
 }
 
+interface AttractionPage {
+  items: AttractionData[];
+  next_cursor: string | null;
+}
+
+// ดึง /attractions/ ทีละหน้า (กรอง place_types ที่ server) หน้าถัดไปโหลดตอนเลื่อนถึงท้ายรายการ
+const fetchAttractionPage = async (placeType: string, cursor?: string | null) => {
+  const res = await axios.get<AttractionPage>(`${API_URL}/attractions/`, {
+    params: { place_types: placeType, cursor: cursor ?? undefined },
+  });
+  return res.data;
+};
+
 export default function Home(){
   const [user, setUser] = useState<any>(null);
   const [attractions, setAttractions] = useState<AttractionData[]>([]);
   const [restaurants, setRestaurants] = useState<AttractionData[]>([]);
+  const [attractionsCursor, setAttractionsCursor] = useState<string | null>(null);
+  const [restaurantsCursor, setRestaurantsCursor] = useState<string | null>(null);
+  const loadingMore = React.useRef({ attractions: false, restaurants: false });
   const [modalVisible, setModalVisible] = useState(false);
   const router = useRouter();
 
@@ -53,14 +69,15 @@ export default function Home(){
   const fetchAttractions = async () => {
     try{
 
-      const res = await axios.get<AttractionData[]>(`${API_URL}/attractions/`);
-      const allData = res.data;
-
-      const attractions = allData.filter(item => item.place_types.includes('tourist_attraction'));
-      const restaurants = allData.filter(item => item.place_types.includes('restaurant'));
+      const [attractionPage, restaurantPage] = await Promise.all([
+        fetchAttractionPage('tourist_attraction'),
+        fetchAttractionPage('restaurant'),
+      ]);
 
-      setAttractions(attractions);
-      setRestaurants(restaurants);
+      setAttractions(attractionPage.items);
+      setAttractionsCursor(attractionPage.next_cursor);
+      setRestaurants(restaurantPage.items);
+      setRestaurantsCursor(restaurantPage.next_cursor);
 
     } catch (err: any) {
       console.log('Fetch attractions error:', err.response?.data || err.message);
@@ -68,6 +85,59 @@ export default function Home(){
   }
 
 
+  const loadMoreAttractions = async () => {
+    if (!attractionsCursor || loadingMore.current.attractions) return;
+    loadingMore.current.attractions = true;
+    try {
+      const page = await fetchAttractionPage('tourist_attraction', attractionsCursor);
+      setAttractions(prev => [...prev, ...page.items]);
+      setAttractionsCursor(page.next_cursor);
+    } catch (err: any) {
+      console.log('Fetch attractions error:', err.response?.data || err.message);
+    } finally {
+      loadingMore.current.attractions = false;
+    }
+  };
+
+  const loadMoreRestaurants = async () => {
+    if (!restaurantsCursor || loadingMore.current.restaurants) return;
+    loadingMore.current.restaurants = true;
+    try {
+      const page = await fetchAttractionPage('restaurant', restaurantsCursor);
+      setRestaurants(prev => [...prev, ...page.items]);
+      setRestaurantsCursor(page.next_cursor);
+    } catch (err: any) {
+      console.log('Fetch restaurants error:', err.response?.data || err.message);
+    } finally {
+      loadingMore.current.restaurants = false;
+    }
+  };
+
+  const renderInfoCard = ({ item }: { item: AttractionData }) => (
+    <View style={{ marginRight: 15 }}>
+      <InfoCard 
+        title={item.name}
+        imageRef={item.photo_ref}
+        rating={item.rating}
+        description={item.description}
+      />
+    </View>
+  );
+
+  const seeMoreCard = (
+    <TouchableOpacity 
+        style={styles.seeMoreCard} 
+        onPress={() => router.push(`/search`)} // กดแล้วไป Tab Search
+    >
+        <View style={styles.seeMoreContent}>
+      
+            <Ionicons name="log-out-outline" style={styles.seeMoreIcon}></Ionicons>
+        
+            <Text style={styles.seeMoreText}>ดูเพิ่มเติม</Text>
+        </View>
+    </TouchableOpacity>
+  );
+
   useFocusEffect(
       React.useCallback(() => {
         fetchProfile();
@@ -108,66 +178,32 @@ export default function Home(){
             <Text style={{fontSize: 24}}> Attraction Recommend </Text>
           </View>
           
-         <ScrollView 
+         <FlatList 
             horizontal={true} 
             showsHorizontalScrollIndicator={false} // ซ่อนบาร์เลื่อนด้านล่างให้สวยงาม
             contentContainerStyle={styles.scrollContainer} // ใช้ style ใหม่สำหรับจัดระยะห่าง
-          >
-            {attractions.map((item) => (
-              <View key={item.attraction_id} style={{ marginRight: 15 }}> 
-  
-                <InfoCard 
-                  title={item.name}
-                  imageRef={item.photo_ref}
-                  rating={item.rating}
-                  description={item.description}
-                />
-              </View>
-            ))}
-
-            <TouchableOpacity 
-                style={styles.seeMoreCard} 
-                onPress={() => router.push(`/search`)}
-            >
-                <View style={styles.seeMoreContent}>
-              
-                    <Ionicons name="log-out-outline" style={styles.seeMoreIcon}></Ionicons>
-                
-                    <Text style={styles.seeMoreText}>ดูเพิ่มเติม</Text>
-                </View>
-            </TouchableOpacity>
-          </ScrollView>
+            data={attractions}
+            keyExtractor={(item) => item.attraction_id.toString()}
+            renderItem={renderInfoCard}
+            onEndReached={loadMoreAttractions}
+            onEndReachedThreshold={0.5}
+            ListFooterComponent={seeMoreCard}
+          />
             
 
         <View>
           <Text style={{fontSize: 24}}> Restaurant Recommend </Text>
-          <ScrollView 
+          <FlatList 
               horizontal={true} 
               showsHorizontalScrollIndicator={false}
               contentContainerStyle={styles.scrollContainer}
-            >
-              {restaurants.map((item) => (
-                <View key={item.attraction_id} style={{ marginRight: 15 }}>
-                  <InfoCard 
-                    title={item.name}
-                    imageRef={item.photo_ref}
-                    rating={item.rating}
-                    description={item.description}
-                  />
-                </View>
-              ))}
-                <TouchableOpacity 
-                  style={styles.seeMoreCard} 
-                  onPress={() => router.push(`/search`)} // กดแล้วไป Tab Search
-              >
-                  <View style={styles.seeMoreContent}>
-                  
-                      <Ionicons name="log-out-outline" style={styles.seeMoreIcon}></Ionicons>
-                    
-                      <Text style={styles.seeMoreText}>ดูเพิ่มเติม</Text>
-                  </View>
-              </TouchableOpacity>
-            </ScrollView>
+              data={restaurants}
+              keyExtractor={(item) => item.attraction_id.toString()}
+              renderItem={renderInfoCard}
+              onEndReached={loadMoreRestaurants}
+              onEndReachedThreshold={0.5}
+              ListFooterComponent={seeMoreCard}
+            />
         </View>
 
         <View>
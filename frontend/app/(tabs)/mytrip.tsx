@@ -25,6 +25,7 @@ type Trip = {
   tripGroup?: {
     members: any[]; // หรือกำหนด Type Member ให้ชัดเจน
   } | null;
+  member_count?: number; // จาก /trip_plan/summary
   image?: string;
 
 };
@@ -111,6 +112,38 @@ export default function TripListScreen() {
   const router = useRouter();
   const [isDeleteMode, setIsDeleteMode] = useState(false);
   const [isGuest, setIsGuest] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchTripPage = async (token: string, cursor?: string | null) => {
+    const res = await axios.get(`${API_URL}/trip_plan/summary`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+      params: { limit: 20, ...(cursor ? { cursor } : {}) },
+      timeout: 10000, // 10 seconds timeout
+    });
+    if (!Array.isArray(res.data?.items)) {
+      throw new Error('Unexpected response format');
+    }
+    return res.data as { items: Trip[]; next_cursor: string | null };
+  };
+
+  const loadMoreTrips = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const token = await AsyncStorage.getItem('access_token');
+      if (!token) return;
+      const page = await fetchTripPage(token, nextCursor);
+      setTrips(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err: any) {
+      console.log('Load more trips failed:', err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   useFocusEffect(
   useCallback(() => {
@@ -126,25 +159,17 @@ export default function TripListScreen() {
           }
 
         setIsGuest(false);
-        const res = await axios.get(`${API_URL}/trip_plan`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-          timeout: 10000, // 10 seconds timeout
-        });
-      if (Array.isArray(res.data)) {
-        setTrips(res.data);
-      } else {
-        console.warn('Expected array, but got:', res.data);
-        setError('Unexpected response format');
-        setTrips([]); // fallback
-      }
+        // ใช้ summary (ไม่มี schedule/สมาชิกทั้งก้อน) โหลดหน้าแรกก่อน หน้าถัดไปโหลดตอนเลื่อนถึงท้ายรายการ
+        const page = await fetchTripPage(token);
+        setTrips(page.items);
+        setNextCursor(page.next_cursor);
 
     setLoading(false);
 
       } catch (err: any) {
         console.log('Online fetch failed, trying SQLite...', err.message);
         try{
+          setNextCursor(null);
           const offlineTrips = await db.getAllAsync('SELECT * FROM TripPlan');
           if (offlineTrips.length > 0 && Array.isArray(offlineTrips)) {
             setTrips(offlineTrips as Trip[]);
@@ -264,7 +289,7 @@ export default function TripListScreen() {
 
     const formattedDate = formatTripDateRange(item.start_plan_date, item.end_plan_date);
     
-    const memberCount = item.tripGroup?.members?.length || 1;
+    const memberCount = item.member_count || item.tripGroup?.members?.length || 1;
     return (
       <View style={styles.cardContainer}>
         <TouchableOpacity 
@@ -332,6 +357,9 @@ export default function TripListScreen() {
             renderItem={renderItem}
             showsVerticalScrollIndicator={false}
             ListEmptyComponent={<EmptyTripState router={router} />}
+            onEndReached={loadMoreTrips}
+            onEndReachedThreshold={0.5}
+            ListFooterComponent={loadingMore ? <ActivityIndicator style={{ marginVertical: 16 }} /> : null}
           />
         )}
       </View>
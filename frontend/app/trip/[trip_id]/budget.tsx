@@ -44,7 +44,10 @@ export default function TripBudgetScreen() {
   const [budget, setBudget] = useState<any>(null);
 
   const [expenses, setExpenses] = useState<Expense[]>([]);
-  const totalSpent = expenses.reduce((sum, item) => sum + (item.amount || 0), 0);
+  // ยอดรวมมาจาก /summary (รวมใน DB) ไม่ต้องโหลด expense ทุกรายการมารวมเอง
+  const [totalSpent, setTotalSpent] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   //expense edit
   const [isEditing, setIsEditing] = useState(false);
   const [editingExpenseId, setEditingExpenseId] = useState<number | null>(null);
@@ -61,18 +64,25 @@ export default function TripBudgetScreen() {
         const token = await AsyncStorage.getItem('access_token');
         if (!token) return;
 
-        const [tripRes, budgetRes] = await Promise.all([
-          axios.get(`${API_URL}/trip_plan/${trip_id}`, {
-            headers: { Authorization: `Bearer ${token}` },
-          }),
-          axios.get(`${API_URL}/budget/plan/${trip_id}`, {
-            headers: { Authorization: `Bearer ${token}` },
-          }),
+        const headers = { Authorization: `Bearer ${token}` };
+        const [tripRes, summaryRes] = await Promise.all([
+          axios.get(`${API_URL}/trip_plan/${trip_id}`, { headers }),
+          // ยังไม่มี budget -> 404 ให้แสดงเป็นไม่มีข้อมูล
+          axios.get(`${API_URL}/budget/plan/${trip_id}/summary`, { headers }).catch(() => null),
         ]);
 
         setTrip(tripRes.data);
-        setBudget(budgetRes.data);
-        setExpenses(budgetRes.data?.expenses || []);
+        const summary = summaryRes?.data ?? null;
+        setBudget(summary);
+        setTotalSpent(summary?.spent ?? 0);
+        setExpenses([]);
+        setNextCursor(null);
+
+        if (summary?.budget_id) {
+          const expensesRes = await axios.get(`${API_URL}/budget/${summary.budget_id}/expenses`, { headers });
+          setExpenses(expensesRes.data.items);
+          setNextCursor(expensesRes.data.next_cursor);
+        }
 
       } catch (error) {
         console.error('Error fetching trip:', error);
@@ -84,6 +94,26 @@ export default function TripBudgetScreen() {
     fetchTrip();
   }, [trip_id]);
 
+  // โหลด expense หน้าถัดไปเมื่อเลื่อนถึงท้ายรายการ
+  const loadMoreExpenses = async () => {
+    if (!nextCursor || loadingMore || !budget?.budget_id) return;
+    setLoadingMore(true);
+    try {
+      const token = await AsyncStorage.getItem('access_token');
+      if (!token) return;
+      const res = await axios.get(`${API_URL}/budget/${budget.budget_id}/expenses`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: nextCursor },
+      });
+      setExpenses(prev => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching expenses:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const openEditBudgetModal = () => {
   setEditBudgetAmount(String(budget));
   setEditBudgetModalVisible(true);
@@ -187,6 +217,8 @@ const handleSave = async () => {
         data,
         { headers: { Authorization: `Bearer ${token}` } }
       ); 
+      const previous = expenses.find(expense => expense.expense_id === editingExpenseId);
+      setTotalSpent(prev => prev - (previous?.amount || 0) + data.amount);
       setExpenses(prev => 
         prev.map(expense => 
           expense.expense_id === editingExpenseId 
@@ -206,7 +238,9 @@ const handleSave = async () => {
         data,
         { headers: { Authorization: `Bearer ${token}` } }
     );
-    setExpenses(prev => [...prev, response.data]);
+    // รายการเรียงใหม่สุดก่อน
+    setExpenses(prev => [response.data, ...prev]);
+    setTotalSpent(prev => prev + (response.data.amount || 0));
   }
 
     // setExpenses(prev => [...prev, expenses.data]);
@@ -322,6 +356,8 @@ const handleSave = async () => {
         <FlatList
             data={expenses}
             keyExtractor={(item) => item.expense_id.toString()}
+            onEndReached={loadMoreExpenses}
+            onEndReachedThreshold={0.5}
             renderItem={({ item }) => (
               <TouchableOpacity onPress={() => openEditExpenseModal(item)}>
                 <View style={styles.expenseItem}>
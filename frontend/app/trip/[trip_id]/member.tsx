@@ -59,7 +59,8 @@ export default function MemberScreen() {
       if (realTripId) {
         // 3. ดึงข้อมูลกลุ่มและสมาชิก
         const groupRes = await axios.get(`${API_URL}/trip_group/${realTripId}`, {
-          headers: { Authorization: `Bearer ${token}` }
+          headers: { Authorization: `Bearer ${token}` },
+          params: { include_members: true } // หน้านี้ต้องใช้รายชื่อสมาชิก
         });
         setTripGroup(groupRes.data);
         
@@ -4,6 +4,7 @@ import {
 } from 'react-native';
 import * as Location from 'expo-location';
 import io from 'socket.io-client';
+import AsyncStorage from '@react-native-async-storage/async-storage';
 import MapView, { Marker, PROVIDER_GOOGLE, Callout } from 'react-native-maps';
 import { Ionicons } from '@expo/vector-icons';
 import { WEBSOCKET_URL } from '@/api.js';
@@ -55,9 +56,12 @@ export default function MemberLocationMap({ groupCode, userId, userName, onClose
 
         // ✅ 1. แก้ชื่อ Event เป็น 'join_group' และส่ง key 'group_id'
         // (ตามไฟล์ get_location.py)
+        // server ตรวจ token + สมาชิกของกลุ่มก่อนให้ join
+        const token = await AsyncStorage.getItem('access_token');
         socket.emit('join_group', { 
             group_id: groupCode, 
-            username: userName 
+            username: userName,
+            token
         });
         setStatus(`Online: ${groupCode}`);
 
@@ -77,6 +81,48 @@ export default function MemberLocationMap({ groupCode, userId, userName, onClose
             }));
         });
 
+        // ตอน join ได้ location ของทุกคนในกลุ่มมาทีเดียว: { fields: [...], members: [[...], ...] }
+        socket.on('group_snapshot', (snapshot: any) => {
+            const idx = (name: string) => snapshot.fields.indexOf(name);
+            const next: any = {};
+            snapshot.members.forEach((row: any[]) => {
+                next[row[idx('sid')]] = {
+                    latitude: row[idx('lat')],
+                    longitude: row[idx('lng')],
+                    username: row[idx('username')],
+                    timestamp: row[idx('timestamp')]
+                };
+            });
+            setOthersLocations(next);
+        });
+
+        // Backend ส่ง location ของคนที่ขยับรวมเป็นชุดเดียวทุกๆ รอบ (มีของเราเองด้วย ให้ข้ามไป)
+        socket.on('group_locations', (items: any[]) => {
+            setOthersLocations((prev: any) => {
+                const next = { ...prev };
+                items.forEach((data: any) => {
+                    if (data.sid === socket.id) return;
+                    next[data.sid] = {
+                        latitude: data.lat,
+                        longitude: data.lng,
+                        username: data.username,
+                        timestamp: data.timestamp
+                    };
+                });
+                return next;
+            });
+        });
+
+        // คนออกจากกลุ่ม หรือเงียบไปนานจน server ลบตำแหน่งทิ้ง -> เอา marker ออก
+        const removeMarker = (data: any) => {
+            setOthersLocations((prev: any) => {
+                const { [data.sid]: _removed, ...rest } = prev;
+                return rest;
+            });
+        };
+        socket.on('user_left', removeMarker);
+        socket.on('location_expired', removeMarker);
+
         // 3. เริ่มส่งตำแหน่งตัวเอง
         locationSubscription.current = await Location.watchPositionAsync(
             {
@@ -105,6 +151,10 @@ export default function MemberLocationMap({ groupCode, userId, userName, onClose
         const socket = getSocket();
         
         socket.off('location_update'); // ✅ ปิด listener ตัวใหม่
+        socket.off('group_locations');
+        socket.off('group_snapshot');
+        socket.off('user_left');
+        socket.off('location_expired');
         
         // ✅ ส่ง event ออกกลุ่ม (ถ้าจำเป็น)
         socket.emit('leave_group', { group_id: groupCode });